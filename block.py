@@ -2,20 +2,31 @@
 # -*- coding: utf-8 -*-
 
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import control as ctl
 import sympy as sp
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas as pdf_canvas
 from reportlab.lib.utils import ImageReader
 import matplotlib.patheffects as pe
-import copy
-
-# Símbolo de Laplace para Sympy
-s_sym = sp.symbols('s')
+import numpy as np
+import os
+
+from diagram import BlockDiagram, SubsystemLibrary, _poly_latex, _tf_latex, s_sym, z_sym
+from freq import FrequencyCache, FrequencyData, DEFAULT_GRID, grid_for, tf_hash
+from delay import PADE_ORDERS, ExactChannel
+from executor import TaskExecutor
+from persistent_cache import PersistentCache
+from plotting import AnalysisViews, DecimatedLine, fit_limits
+from model_reduction import balanced_truncation
+from montecarlo import parse_uncertainty, run_monte_carlo
+from tuning import OBJECTIVES as TUNING_OBJECTIVES, parse_bounds, parse_controllers, tune
+from simulation import NONLINEAR_BLOCKS, default_timing
+from symbolic import parse_coefficient
+from discrete import C2D_METHODS, DiscreteSimulator, default_horizon, is_discrete
 
 def configure_style():
     style = ttk.Style()
@@ -39,120 +50,6 @@ def configure_style():
     style.configure('TLabelframe', background='white', foreground='#0A2667')
     style.configure('TLabelframe.Label', background='white', foreground='#0A2667')
 
-class BlockDiagram:
-    """Armazena os blocos e reduz o diagrama."""
-    def __init__(self):
-        self.edges = []
-        self.feedback_signs = {}  # Armazena os sinais de feedback
-
-    def add_block(self, u: str, v: str, tf: ctl.TransferFunction, sign='+'):
-        # Verifica se o bloco já existe
-        for edge in self.edges:
-            if edge['u'] == u and edge['v'] == v:
-                raise ValueError(f"Bloco {u}→{v} já existe!")
-        
-        self.edges.append({'u': u, 'v': v, 'tf': tf})
-        if u != 'input' and v != 'output':  # Assume que é um bloco de feedback
-            self.feedback_signs[(u, v)] = sign
-
-    def _find_series_blocks(self):
-        """Encontra blocos em série que podem ser reduzidos."""
-        # Cria um mapeamento de saídas para blocos
-        output_map = {e['v']: e for e in self.edges}
-        
-        for e in list(self.edges):  # Usamos list() para criar uma cópia
-            # Se houver um bloco que começa onde este termina
-            if e['v'] in output_map and e['v'] != 'output' and e['u'] != 'output':
-                e2 = output_map[e['v']]
-                if e2 in self.edges:  # Verifica se ainda está na lista
-                    return e, e2
-        return None, None
-
-    def _find_parallel_blocks(self):
-        """Encontra blocos em paralelo que podem ser reduzidos."""
-        edges_copy = list(self.edges)  # Trabalha com uma cópia
-        for i in range(len(edges_copy)):
-            for j in range(i+1, len(edges_copy)):
-                e1 = edges_copy[i]
-                e2 = edges_copy[j]
-                if e1['u'] == e2['u'] and e1['v'] == e2['v']:
-                    # Verifica se ambos ainda estão na lista principal
-                    if e1 in self.edges and e2 in self.edges:
-                        return e1, e2
-        return None, None
-
-    def _find_feedback_blocks(self):
-        """Encontra blocos em realimentação que podem ser reduzidos."""
-        edges_copy = list(self.edges)  # Trabalha com uma cópia
-        for i in range(len(edges_copy)):
-            for j in range(len(edges_copy)):
-                if i == j:
-                    continue
-                e1 = edges_copy[i]
-                e2 = edges_copy[j]
-                if e1['u'] == e2['v'] and e1['v'] == e2['u']:
-                    # Verifica se ambos ainda estão na lista principal
-                    if e1 in self.edges and e2 in self.edges:
-                        return e1, e2
-        return None, None
-
-    def reduce(self) -> ctl.TransferFunction:
-        """Reduz o diagrama de blocos até obter uma única função de transferência."""
-        edges = copy.deepcopy(self.edges)
-        feedback_signs = copy.deepcopy(self.feedback_signs)
-        
-        changed = True
-        while changed and len(edges) > 1:
-            changed = False
-            
-            # Tenta reduzir série primeiro
-            e1, e2 = self._find_series_blocks()
-            if e1 and e2 and e1 in edges and e2 in edges:
-                new_tf = ctl.series(e1['tf'], e2['tf'])
-                edges.remove(e1)
-                edges.remove(e2)
-                edges.append({'u': e1['u'], 'v': e2['v'], 'tf': new_tf})
-                changed = True
-                continue
-                
-            # Tenta reduzir paralelo
-            e1, e2 = self._find_parallel_blocks()
-            if e1 and e2 and e1 in edges and e2 in edges:
-                new_tf = ctl.parallel(e1['tf'], e2['tf'])
-                edges.remove(e1)
-                edges.remove(e2)
-                edges.append({'u': e1['u'], 'v': e1['v'], 'tf': new_tf})
-                changed = True
-                continue
-                
-            # Tenta reduzir realimentação
-            fwd, fb = self._find_feedback_blocks()
-            if fwd and fb and fwd in edges and fb in edges:
-                sign = feedback_signs.get((fb['u'], fb['v']), '-')
-                new_tf = ctl.feedback(fwd['tf'], fb['tf'], sign=sign)
-                edges.remove(fwd)
-                edges.remove(fb)
-                edges.append({'u': fwd['u'], 'v': fwd['v'], 'tf': new_tf})
-                changed = True
-                continue
-
-        # Verifica se sobrou apenas um bloco input->output
-        remaining = [e for e in edges if e['u'] == 'input' and e['v'] == 'output']
-        if len(remaining) == 1:
-            return remaining[0]['tf']
-
-        # Se não conseguiu reduzir, tenta combinar os blocos de outra forma
-        if len(edges) > 1:
-            # Tenta combinar todos os blocos em paralelo
-            try:
-                parallel_tf = edges[0]['tf']
-                for e in edges[1:]:
-                    parallel_tf = ctl.parallel(parallel_tf, e['tf'])
-                return parallel_tf
-            except:
-                pass
-
-        raise ValueError(f"Não foi possível reduzir ({len(edges)} blocos). Diagrama muito complexo ou mal formado.")
 
 class BlockDiagramAcadApp:
     """Interface principal com abas: Entrada, Diagrama e Análise."""
@@ -168,13 +65,36 @@ class BlockDiagramAcadApp:
         except Exception as e:
             print(f"Erro ao carregar ícone: {e}")
 
+        self.library = SubsystemLibrary()  # Subsistemas reutilizáveis
         self.bd = BlockDiagram()
+        self.bd.library = self.library
         self.current_tf = None  # Armazena a função de transferência atual
+        self.current_tfm = {}   # Matriz de transferência {(saída, entrada): TF}
+        self.current_tex = {}   # LaTeX de cada canal
+        self.current_bd = None  # Cópia do diagrama da última redução (avaliação exata de atrasos)
+        self.full_tf = None     # Modelo completo quando current_tf é o modelo de ordem reduzida
+        self.tuning = None      # TuningResult da última sintonia automática
+        self._compiled = (None, None)  # (chave do diagrama, CompiledTransfer)
+        # Cálculos pesados rodam fora do mainloop; resultados voltam via root.after.
+        # Sintonia e Monte Carlo (longos) têm chaves próprias: sobram threads para os gráficos
+        self.executor = TaskExecutor(root, max_workers=4, on_progress=self._on_task_progress,
+                                     on_idle=self._on_tasks_idle)
+        root.protocol("WM_DELETE_WINDOW", self._on_close)
+        # Cache em disco de reduções, LaTeX e respostas, reaproveitado entre sessões
+        try:
+            self.store = PersistentCache()
+        except Exception as e:
+            print(f"Cache persistente indisponível: {e}")
+            self.store = None
+        self.freq_cache = FrequencyCache(store=self.store)  # Compartilhado por Bode, Nyquist, Nichols e margens
         self._build_ui()
 
     def _build_ui(self):
         nb = ttk.Notebook(self.root)
         nb.pack(fill=tk.BOTH, expand=True)
+        self.nb = nb
+        self._graph_stale = False  # Diagrama desenhado desatualizado (redesenha ao exibir a aba)
+        nb.bind('<<NotebookTabChanged>>', self._on_tab_changed)
 
         tab1 = ttk.Frame(nb); nb.add(tab1, text="Entrada")
         self._build_tab_input(tab1)
@@ -217,7 +137,7 @@ class BlockDiagramAcadApp:
         ttk.Label(ef, text="Sinal:").grid(row=0, column=4, **pad)
         self.e_sign = ttk.Combobox(ef, values=['+', '-'], width=3)
         self.e_sign.grid(row=0, column=5, **pad)
-        self.e_sign.set('-')  # Padrão para feedback negativo
+        self.e_sign.set('+')  # Sinal do bloco no somador de destino; '-' na realimentação negativa
 
         ttk.Label(ef, text="Num coef.:").grid(row=1, column=0, **pad)
         self.e_num = ttk.Entry(ef, width=40); self.e_num.grid(row=1, column=1, columnspan=5, **pad)
@@ -229,6 +149,27 @@ class BlockDiagramAcadApp:
         ttk.Label(ef, text="Den poly:").grid(row=4, column=0, **pad)
         self.e_den_poly = ttk.Entry(ef, width=40); self.e_den_poly.grid(row=4, column=1, columnspan=5, **pad)
 
+        # Tempo de amostragem: vazio = bloco contínuo (s); preenchido = bloco discreto (z)
+        ttk.Label(ef, text="Ts (s):").grid(row=6, column=0, **pad)
+        self.e_ts = ttk.Entry(ef, width=10); self.e_ts.grid(row=6, column=1, **pad)
+        self.e_ts.bind("<KeyRelease>", lambda e: self._update_preview())
+        ttk.Label(ef, text="Discretização:").grid(row=6, column=2, **pad)
+        self.cb_c2d = ttk.Combobox(ef, values=list(C2D_METHODS), width=8, state='readonly')
+        self.cb_c2d.grid(row=6, column=3, **pad)
+        self.cb_c2d.set('zoh')
+
+        # Valores nominais dos parâmetros simbólicos usados nos coeficientes
+        ttk.Label(ef, text="Parâmetros:").grid(row=7, column=0, **pad)
+        self.e_params = ttk.Entry(ef, width=40); self.e_params.grid(row=7, column=1, columnspan=5, **pad)
+
+        # Nós de entrada e saída do diagrama (separados por vírgula)
+        ttk.Label(ef, text="Entradas:").grid(row=5, column=0, **pad)
+        self.e_inputs = ttk.Entry(ef, width=18); self.e_inputs.grid(row=5, column=1, **pad)
+        self.e_inputs.insert(0, 'input')
+        ttk.Label(ef, text="Saídas:").grid(row=5, column=2, **pad)
+        self.e_outputs = ttk.Entry(ef, width=18); self.e_outputs.grid(row=5, column=3, **pad)
+        self.e_outputs.insert(0, 'output')
+
         pv = ttk.LabelFrame(frame, text="Pré-visualização G(s)")
         pv.pack(fill=tk.BOTH, **pad)
         self.fig_prev = plt.Figure(figsize=(4,1), facecolor='white')
@@ -241,6 +182,42 @@ class BlockDiagramAcadApp:
 
         ttk.Button(frame, text="➕ Adicionar Bloco", command=self._on_add_block).pack(**pad)
 
+        # Subsistemas: diagramas nomeados usados como um único bloco
+        sf = ttk.LabelFrame(frame, text="Subsistemas")
+        sf.pack(fill=tk.X, **pad)
+        self.cb_sub = ttk.Combobox(sf, width=18, state='readonly')
+        self.cb_sub.pack(side=tk.LEFT, **pad)
+        ttk.Button(sf, text="Inserir como Bloco (Origem→Destino)",
+                   command=self._on_add_subsystem).pack(side=tk.LEFT, **pad)
+        ttk.Button(sf, text="Salvar Diagrama como Subsistema",
+                   command=self._on_save_subsystem).pack(side=tk.LEFT, **pad)
+
+        # Blocos não lineares (usados apenas na simulação no tempo)
+        nf = ttk.LabelFrame(frame, text="Bloco Não Linear")
+        nf.pack(fill=tk.X, **pad)
+        self.cb_nl = ttk.Combobox(nf, values=list(NONLINEAR_BLOCKS), width=12, state='readonly')
+        self.cb_nl.pack(side=tk.LEFT, **pad)
+        self.cb_nl.set('saturation')
+        ttk.Label(nf, text="Parâmetros:").pack(side=tk.LEFT)
+        self.e_nl = ttk.Entry(nf, width=20)
+        self.e_nl.pack(side=tk.LEFT, **pad)
+        self.e_nl.insert(0, 'lo=-1, hi=1')
+        ttk.Button(nf, text="Inserir (Origem→Destino)",
+                   command=self._on_add_nonlinear).pack(side=tk.LEFT, **pad)
+
+        # Atraso de transporte e^{-sT}: exato em frequência e na simulação, Padé na redução
+        df = ttk.LabelFrame(frame, text="Atraso de Transporte")
+        df.pack(fill=tk.X, **pad)
+        ttk.Label(df, text="T (s):").pack(side=tk.LEFT, **pad)
+        self.e_delay = ttk.Entry(df, width=10)
+        self.e_delay.pack(side=tk.LEFT, **pad)
+        ttk.Label(df, text="Ordem Padé:").pack(side=tk.LEFT)
+        self.cb_pade = ttk.Combobox(df, values=list(PADE_ORDERS), width=3, state='readonly')
+        self.cb_pade.pack(side=tk.LEFT, **pad)
+        self.cb_pade.set(3)
+        ttk.Button(df, text="Inserir (Origem→Destino)",
+                   command=self._on_add_delay).pack(side=tk.LEFT, **pad)
+
         lf = ttk.LabelFrame(frame, text="Blocos Cadastrados")
         lf.pack(fill=tk.BOTH, expand=True, **pad)
         
@@ -252,6 +229,10 @@ class BlockDiagramAcadApp:
         ttk.Button(btn_frame, text="🗑️ Deletar Selecionado", 
                   command=self._delete_selected_block).pack(side=tk.LEFT, padx=5)
         
+        # Botão para trocar os coeficientes do bloco selecionado pelos do formulário
+        ttk.Button(btn_frame, text="✏️ Atualizar Selecionado",
+                  command=self._update_selected_block).pack(side=tk.LEFT, padx=5)
+
         # Botão para limpar todos os blocos
         ttk.Button(btn_frame, text="🧹 Limpar Todos", 
                   command=self._clear_all_blocks).pack(side=tk.LEFT, padx=5)
@@ -266,6 +247,8 @@ class BlockDiagramAcadApp:
         
         # Adiciona bind para deletar com tecla Delete
         self.lst.bind('<Delete>', lambda e: self._delete_selected_block())
+        # Duplo clique carrega os coeficientes do bloco no formulário para edição
+        self.lst.bind('<Double-Button-1>', lambda e: self._load_selected_block())
 
         # Frame para as imagens (lado direito)
         img_frame = ttk.Frame(main_frame, width=300)
@@ -326,6 +309,71 @@ class BlockDiagramAcadApp:
         self._draw_graph()
         messagebox.showinfo("Sucesso", "Bloco removido com sucesso!")
 
+    def _selected_edge(self):
+        """Índice na lista e aresta do bloco selecionado ((None, None) sem seleção)."""
+        selection = self.lst.curselection()
+        if not selection:
+            return None, None
+        u, _, rest = self.lst.get(selection[0]).split(" : ")[0].partition("→")
+        u, v = u.strip(), rest.split(" (")[0].strip()
+        edge = next((e for e in self.bd.edges if e['u'] == u and e['v'] == v), None)
+        return selection[0], edge
+
+    def _load_selected_block(self):
+        """Preenche o formulário com os coeficientes do bloco selecionado."""
+        _, edge = self._selected_edge()
+        if edge is None or (edge.get('tf') is None and edge.get('expr') is None):
+            return
+        if edge.get('expr') is not None:
+            num, den = edge['expr']
+            Ts = 0
+        else:
+            num, den = edge['tf'].num[0][0], edge['tf'].den[0][0]
+            Ts = edge['tf'].dt if is_discrete(edge['tf']) else 0
+        fmt = lambda c: f"{c:g}" if isinstance(c, (int, float, np.floating)) else str(c)
+        self.var_fmt.set('coef')
+        self._toggle_format()
+        for w, value in ((self.e_u, edge['u']), (self.e_v, edge['v']),
+                         (self.e_num, " ".join(fmt(c) for c in num)),
+                         (self.e_den, " ".join(fmt(c) for c in den)),
+                         (self.e_ts, f"{Ts:g}" if Ts else "")):
+            w.delete(0, tk.END)
+            w.insert(0, value)
+        self._update_preview()
+
+    def _update_selected_block(self):
+        """Troca os coeficientes do bloco selecionado e recalcula só o que depende dele."""
+        index, edge = self._selected_edge()
+        if edge is None:
+            return messagebox.showwarning("Aviso", "Nenhum bloco selecionado!")
+        try:
+            num, den, Ts = self._read_coefficients()
+            self._apply_io()
+            self.bd.set_coefficients(edge['u'], edge['v'], num, den, Ts)
+        except Exception as e:
+            return messagebox.showerror("Erro", str(e))
+
+        self._refresh_block_row(edge)
+        self.lst.selection_set(index)
+        # A topologia não mudou: o desenho é refeito só quando a aba Diagrama for exibida
+        self._graph_stale = True
+        if self.current_tfm:
+            self._on_calc()
+
+    def _refresh_block_row(self, edge):
+        """Atualiza a linha do bloco na lista após uma troca de coeficientes."""
+        prefix = f"{edge['u']}→{edge['v']} ("
+        for index in range(self.lst.size()):
+            label = self.lst.get(index).split(" : ")[0]
+            if label.startswith(prefix):
+                self.lst.delete(index)
+                self.lst.insert(index, f"{label} : ${self._edge_latex(edge)}$")
+                return
+
+    def _on_tab_changed(self, event=None):
+        if self._graph_stale and self.nb.index('current') == 1:
+            self._draw_graph()
+
     def _clear_all_blocks(self):
         """Remove todos os blocos cadastrados."""
         if not self.bd.edges:
@@ -345,23 +393,41 @@ class BlockDiagramAcadApp:
                         (self.e_num_poly, not coef), (self.e_den_poly, not coef)):
             (w.grid() if show else w.grid_remove())
 
+    def _sample_time(self):
+        """Tempo de amostragem informado (0 para blocos contínuos em s)."""
+        txt = self.e_ts.get().strip().replace(',', '.')
+        if not txt:
+            return 0
+        Ts = float(txt)
+        if Ts <= 0:
+            raise ValueError("O tempo de amostragem deve ser positivo.")
+        return Ts
+
+    def _read_coefficients(self):
+        """Lê numerador e denominador do formulário, em s ou em z conforme o Ts."""
+        Ts = self._sample_time()
+        var = z_sym if Ts else s_sym
+        if self.var_fmt.get() == 'coef':
+            # Coeficientes podem ser números ou expressões em parâmetros (ex.: K, 2*tau)
+            num = [parse_coefficient(c) for c in self.e_num.get().split()]
+            den = [parse_coefficient(c) for c in self.e_den.get().split()]
+        else:
+            pn = sp.parse_expr(self.e_num_poly.get().replace('^','**'), {'s': s_sym, 'z': z_sym})
+            pd = sp.parse_expr(self.e_den_poly.get().replace('^','**'), {'s': s_sym, 'z': z_sym})
+            num = [c if c.free_symbols else float(c) for c in sp.Poly(pn, var).all_coeffs()]
+            den = [c if c.free_symbols else float(c) for c in sp.Poly(pd, var).all_coeffs()]
+        return num, den, Ts
+
     def _update_preview(self):
+        var = 's'
         try:
-            if self.var_fmt.get() == 'coef':
-                num = [float(c) for c in self.e_num.get().split()]
-                den = [float(c) for c in self.e_den.get().split()]
-            else:
-                pn = sp.parse_expr(self.e_num_poly.get().replace('^','**'), {'s': s_sym})
-                pd = sp.parse_expr(self.e_den_poly.get().replace('^','**'), {'s': s_sym})
-                num = [float(c) for c in sp.Poly(pn, s_sym).all_coeffs()]
-                den = [float(c) for c in sp.Poly(pd, s_sym).all_coeffs()]
-            ne = sum(c*s_sym**i for i, c in enumerate(reversed(num)))
-            de = sum(c*s_sym**i for i, c in enumerate(reversed(den)))
-            tex = sp.latex(sp.simplify(ne/de))
+            num, den, Ts = self._read_coefficients()
+            var = 'z' if Ts else 's'
+            tex = _poly_latex(num, den, z_sym if Ts else s_sym)
         except:
             tex = r"\text{Inválido}"
         self.ax_prev.clear()
-        self.ax_prev.text(0.1, 0.5, f"$G(s)={tex}$", size=14, color='#0A2667')
+        self.ax_prev.text(0.1, 0.5, f"$G({var})={tex}$", size=14, color='#0A2667')
         self.ax_prev.axis('off')
         self.ax_prev.set_facecolor('white')
         self.canvas_prev.draw()
@@ -372,27 +438,23 @@ class BlockDiagramAcadApp:
         if not u or not v:
             return messagebox.showwarning("Aviso", "Origem e Destino obrigatórios.")
         try:
-            if self.var_fmt.get() == 'coef':
-                num = [float(c) for c in self.e_num.get().split()]
-                den = [float(c) for c in self.e_den.get().split()]
-            else:
-                pn = sp.parse_expr(self.e_num_poly.get().replace('^','**'), {'s': s_sym})
-                pd = sp.parse_expr(self.e_den_poly.get().replace('^','**'), {'s': s_sym})
-                num = [float(c) for c in sp.Poly(pn, s_sym).all_coeffs()]
-                den = [float(c) for c in sp.Poly(pd, s_sym).all_coeffs()]
+            num, den, Ts = self._read_coefficients()
         except Exception as e:
             return messagebox.showerror("Erro", str(e))
 
         try:
-            tf = ctl.TransferFunction(num, den)
-            self.bd.add_block(u, v, tf, sign)
+            self._apply_io()
+            if all(isinstance(c, float) for c in num + den):
+                tf = ctl.TransferFunction(num, den, Ts) if Ts else ctl.TransferFunction(num, den)
+                self.bd.add_block(u, v, tf, sign)
+            elif Ts:
+                raise ValueError("Parâmetros simbólicos são suportados apenas em blocos contínuos.")
+            else:
+                self.bd.add_parametric_block(u, v, num, den, sign)
         except ValueError as e:
             return messagebox.showerror("Erro", str(e))
 
-        ne = sum(c*s_sym**i for i, c in enumerate(reversed(num)))
-        de = sum(c*s_sym**i for i, c in enumerate(reversed(den)))
-        expr = sp.latex(sp.simplify(ne/de))
-        self.lst.insert(tk.END, f"{u}→{v} ({sign}) : ${expr}$")
+        self.lst.insert(tk.END, f"{u}→{v} ({sign}) : ${self._edge_latex(self.bd.edges[-1])}$")
 
         self._draw_graph()
         self._update_preview()
@@ -401,6 +463,102 @@ class BlockDiagramAcadApp:
                   self.e_num_poly, self.e_den_poly):
             w.delete(0, tk.END)
 
+    def _edge_latex(self, e):
+        """LaTeX do bloco: a TF do bloco ou o nome do subsistema."""
+        if e.get('sub') is not None:
+            return r"\mathrm{" + e['sub'].replace('_', r'\_') + "}"
+        if e.get('expr') is not None:
+            return _poly_latex(*e['expr'])
+        if e.get('delay') is not None:
+            return f"e^{{-{e['delay']:g}s}}"
+        if e.get('nl') is not None:
+            kind, params = e['nl']
+            return r"\mathrm{" + kind + "}(" + ", ".join(f"{n}={v:g}" for n, v in params) + ")"
+        key = tf_hash(e['tf'])
+        tex = self.store.get(key, 'latex') if self.store is not None else None
+        if tex is None:
+            tex = _tf_latex(e['tf'])
+            if self.store is not None:
+                self.store.put(key, 'latex', tex)
+        return tex
+
+    def _on_add_subsystem(self):
+        """Insere o subsistema selecionado como bloco Origem→Destino."""
+        u, v = self.e_u.get().strip(), self.e_v.get().strip()
+        sign = self.e_sign.get().strip()
+        name = self.cb_sub.get()
+        if not u or not v:
+            return messagebox.showwarning("Aviso", "Origem e Destino obrigatórios.")
+        if not name:
+            return messagebox.showwarning("Aviso", "Selecione um subsistema.")
+        try:
+            self._apply_io()
+            self.bd.add_subsystem(u, v, name, sign)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+
+        self.lst.insert(tk.END, f"{u}→{v} ({sign}) : ${self._edge_latex(self.bd.edges[-1])}$")
+        self._draw_graph()
+        for w in (self.e_u, self.e_v):
+            w.delete(0, tk.END)
+
+    def _on_add_nonlinear(self):
+        """Insere o bloco não linear selecionado como bloco Origem→Destino."""
+        u, v = self.e_u.get().strip(), self.e_v.get().strip()
+        sign = self.e_sign.get().strip()
+        if not u or not v:
+            return messagebox.showwarning("Aviso", "Origem e Destino obrigatórios.")
+        try:
+            params = {}
+            for item in self.e_nl.get().split(','):
+                if item.strip():
+                    name, _, value = item.partition('=')
+                    params[name.strip()] = float(value)
+            self._apply_io()
+            self.bd.add_nonlinear_block(u, v, self.cb_nl.get(), sign, **params)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+
+        self.lst.insert(tk.END, f"{u}→{v} ({sign}) : ${self._edge_latex(self.bd.edges[-1])}$")
+        self._draw_graph()
+        for w in (self.e_u, self.e_v):
+            w.delete(0, tk.END)
+
+    def _on_add_delay(self):
+        """Insere um atraso de transporte como bloco Origem→Destino."""
+        u, v = self.e_u.get().strip(), self.e_v.get().strip()
+        sign = self.e_sign.get().strip()
+        if not u or not v:
+            return messagebox.showwarning("Aviso", "Origem e Destino obrigatórios.")
+        try:
+            T = float(self.e_delay.get().strip().replace(',', '.'))
+            self._apply_io()
+            self.bd.add_delay_block(u, v, T, sign)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+
+        self.lst.insert(tk.END, f"{u}→{v} ({sign}) : ${self._edge_latex(self.bd.edges[-1])}$")
+        self._draw_graph()
+        for w in (self.e_u, self.e_v, self.e_delay):
+            w.delete(0, tk.END)
+
+    def _on_save_subsystem(self):
+        """Salva o diagrama atual como subsistema nomeado (redefine se o nome já existir)."""
+        if not self.bd.edges:
+            return messagebox.showinfo("Informação", "Não há blocos para salvar!")
+        name = simpledialog.askstring("Subsistema", "Nome do subsistema:", parent=self.root)
+        if not name:
+            return
+        try:
+            self._apply_io()
+            self.library.define(name.strip(), self.bd.copy())
+            self.library.prune()
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        self.cb_sub.config(values=sorted(self.library.definitions))
+        self.cb_sub.set(name.strip())
+        messagebox.showinfo("Sucesso", f"Subsistema '{name.strip()}' salvo!")
+
     # Aba "Diagrama"
     def _build_tab_diagram(self, frame):
         self.fig_graph = plt.Figure(figsize=(5,4), facecolor='white')
@@ -411,6 +569,7 @@ class BlockDiagramAcadApp:
         self.canvas_graph.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     def _draw_graph(self):
+        self._graph_stale = False
         ax = self.ax_graph
         ax.clear()
         ax.set_xlim(0, 1)
@@ -425,10 +584,10 @@ class BlockDiagramAcadApp:
         # 1) Extrai forward e feedback
         forward, feedback = [], []
         used = set()
-        current = 'input'
+        current = self.bd.inputs[0]
         
         # Tenta encontrar o caminho direto
-        while current != 'output' and current is not None:
+        while current not in self.bd.outputs and current is not None:
             next_edge = None
             for e in self.bd.edges:
                 if e['u'] == current and (e['u'], e['v']) not in used:
@@ -492,7 +651,7 @@ class BlockDiagramAcadApp:
             ax.add_patch(circ)
             
             # Determina o sinal do feedback
-            fb_sign = '-'
+            fb_sign = '+'
             for e in feedback:
                 if (e['u'], e['v']) in self.bd.feedback_signs:
                     fb_sign = self.bd.feedback_signs[(e['u'], e['v'])]
@@ -519,10 +678,7 @@ class BlockDiagramAcadApp:
                                 pe.Normal()])
             ax.add_patch(rect)
 
-            num, den = e['tf'].num[0][0], e['tf'].den[0][0]
-            ne = sum(c*s_sym**k for k, c in enumerate(reversed(num)))
-            de = sum(c*s_sym**k for k, c in enumerate(reversed(den)))
-            gs = sp.latex(sp.simplify(ne/de))
+            gs = self._edge_latex(e)
             ax.text(x, y, f"${gs}$", ha='center', va='center',
                     fontsize=12, color='white',
                     path_effects=[pe.Stroke(linewidth=1.5, foreground='black'),
@@ -556,10 +712,7 @@ class BlockDiagramAcadApp:
                                     pe.Normal()])
             ax.add_patch(rect_fb)
 
-            num, den = e['tf'].num[0][0], e['tf'].den[0][0]
-            ne = sum(c*s_sym**k for k, c in enumerate(reversed(num)))
-            de = sum(c*s_sym**k for k, c in enumerate(reversed(den)))
-            hs = sp.latex(sp.simplify(ne/de))
+            hs = self._edge_latex(e)
             ax.text(h_x, h_y, f"${hs}$", ha='center', va='center', fontsize=10,
                     color='#0A2667',
                     path_effects=[pe.Stroke(linewidth=1, foreground='white'),
@@ -592,8 +745,16 @@ class BlockDiagramAcadApp:
         
         ttk.Button(analysis_frame, text="Calcular G(s)", 
                   command=self._on_calc).pack(side=tk.LEFT, **pad)
+        ttk.Label(analysis_frame, text="Canal:").pack(side=tk.LEFT)
+        self.cb_channel = ttk.Combobox(analysis_frame, width=14, state='readonly')
+        self.cb_channel.pack(side=tk.LEFT, **pad)
+        self.cb_channel.bind("<<ComboboxSelected>>", self._on_channel_selected)
         ttk.Button(analysis_frame, text="Bode", 
                   command=self._plot_bode).pack(side=tk.LEFT, **pad)
+        ttk.Button(analysis_frame, text="Nyquist", 
+                  command=self._plot_nyquist).pack(side=tk.LEFT, **pad)
+        ttk.Button(analysis_frame, text="Nichols", 
+                  command=self._plot_nichols).pack(side=tk.LEFT, **pad)
         ttk.Button(analysis_frame, text="Degrau", 
                   command=self._plot_step).pack(side=tk.LEFT, **pad)
         ttk.Button(analysis_frame, text="Exportar PDF", 
@@ -618,7 +779,102 @@ class BlockDiagramAcadApp:
         ttk.Label(input_frame, text="/").grid(row=1, column=2, **pad)
         self.h_den_entry = ttk.Entry(input_frame, width=30)
         self.h_den_entry.grid(row=1, column=3, **pad)
+
+        # Varredura de parâmetros simbólicos (ex.: "K=0.1:10:100, tau=0.05:2:100")
+        sweep_frame = ttk.LabelFrame(frame, text="Varredura de Parâmetros")
+        sweep_frame.pack(fill=tk.X, **pad)
+        ttk.Label(sweep_frame, text="Faixas (nome=mín:máx:pontos):").pack(side=tk.LEFT, **pad)
+        self.e_sweep = ttk.Entry(sweep_frame, width=40)
+        self.e_sweep.pack(side=tk.LEFT, **pad)
+        ttk.Button(sweep_frame, text="Polos",
+                  command=self._on_sweep).pack(side=tk.LEFT, **pad)
         
+        # Redução de ordem do modelo (truncamento balanceado) aplicada após o cálculo de G(s)
+        mor_frame = ttk.LabelFrame(frame, text="Redução de Ordem (truncamento balanceado)")
+        mor_frame.pack(fill=tk.X, **pad)
+        self.var_mor = tk.BooleanVar(master=self.root, value=False)
+        ttk.Checkbutton(mor_frame, text="Ativa", variable=self.var_mor,
+                        command=self._on_channel_selected).pack(side=tk.LEFT, **pad)
+        ttk.Label(mor_frame, text="Ordem:").pack(side=tk.LEFT, **pad)
+        self.e_mor_order = ttk.Entry(mor_frame, width=5)
+        self.e_mor_order.pack(side=tk.LEFT, **pad)
+        ttk.Label(mor_frame, text="ou erro máx. (H∞):").pack(side=tk.LEFT, **pad)
+        self.e_mor_tol = ttk.Entry(mor_frame, width=8)
+        self.e_mor_tol.pack(side=tk.LEFT, **pad)
+        ttk.Button(mor_frame, text="Aplicar",
+                  command=self._apply_order_reduction).pack(side=tk.LEFT, **pad)
+        self.var_compare = tk.BooleanVar(master=self.root, value=False)
+        ttk.Checkbutton(mor_frame, text="Comparar com completo",
+                        variable=self.var_compare).pack(side=tk.LEFT, **pad)
+        self.lbl_mor = ttk.Label(mor_frame, text="")
+        self.lbl_mor.pack(side=tk.LEFT, **pad)
+
+        # Monte Carlo: distribuições para parâmetros ou coeficientes (ex.: "K=N(2,0.2); a→b.den[1]=±10%")
+        mc_frame = ttk.LabelFrame(frame, text="Monte Carlo (incertezas)")
+        mc_frame.pack(fill=tk.X, **pad)
+        ttk.Label(mc_frame, text="Incertezas:").pack(side=tk.LEFT, **pad)
+        self.e_mc = ttk.Entry(mc_frame, width=40)
+        self.e_mc.pack(side=tk.LEFT, **pad)
+        ttk.Label(mc_frame, text="Amostras:").pack(side=tk.LEFT, **pad)
+        self.e_mc_n = ttk.Entry(mc_frame, width=7)
+        self.e_mc_n.pack(side=tk.LEFT, **pad)
+        self.e_mc_n.insert(0, '2000')
+        self.var_mc_proc = tk.BooleanVar(master=self.root, value=False)
+        ttk.Checkbutton(mc_frame, text="Processos", variable=self.var_mc_proc).pack(side=tk.LEFT, **pad)
+        ttk.Button(mc_frame, text="Monte Carlo",
+                  command=self._on_monte_carlo).pack(side=tk.LEFT, **pad)
+
+        # Sintonia automática: blocos controladores (ex.: "e→u:pid") e limites ("Kp=0:10; Ki=0:5")
+        tune_frame = ttk.LabelFrame(frame, text="Sintonia Automática (PID / avanço-atraso)")
+        tune_frame.pack(fill=tk.X, **pad)
+        row1, row2 = ttk.Frame(tune_frame), ttk.Frame(tune_frame)
+        row1.pack(fill=tk.X)
+        row2.pack(fill=tk.X)
+        ttk.Label(row1, text="Controladores:").pack(side=tk.LEFT, **pad)
+        self.e_tune_ctrl = ttk.Entry(row1, width=20)
+        self.e_tune_ctrl.pack(side=tk.LEFT, **pad)
+        ttk.Label(row1, text="Limites:").pack(side=tk.LEFT, **pad)
+        self.e_tune_bounds = ttk.Entry(row1, width=35)
+        self.e_tune_bounds.pack(side=tk.LEFT, **pad)
+        ttk.Label(row1, text="Gerações:").pack(side=tk.LEFT, **pad)
+        self.e_tune_gen = ttk.Entry(row1, width=5)
+        self.e_tune_gen.pack(side=tk.LEFT, **pad)
+        self.e_tune_gen.insert(0, '40')
+        self.var_tune_proc = tk.BooleanVar(master=self.root, value=False)
+        ttk.Checkbutton(row1, text="Processos", variable=self.var_tune_proc).pack(side=tk.LEFT, **pad)
+        ttk.Label(row2, text="Objetivo:").pack(side=tk.LEFT, **pad)
+        self.cb_tune_obj = ttk.Combobox(row2, values=list(TUNING_OBJECTIVES.values()), width=22, state='readonly')
+        self.cb_tune_obj.pack(side=tk.LEFT, **pad)
+        self.cb_tune_obj.set('ITAE')
+        self.e_tune = {}
+        for key, text in (('os', "Mp máx (%):"), ('ts', "ts máx (s):"),
+                          ('gm', "MG mín (dB):"), ('pm', "MF mín (°):")):
+            ttk.Label(row2, text=text).pack(side=tk.LEFT)
+            self.e_tune[key] = ttk.Entry(row2, width=6)
+            self.e_tune[key].pack(side=tk.LEFT, **pad)
+        self.e_tune['os'].insert(0, '10')
+        self.e_tune['gm'].insert(0, '6')
+        self.e_tune['pm'].insert(0, '45')
+        ttk.Button(row2, text="Sintonizar",
+                  command=self._on_tune).pack(side=tk.LEFT, **pad)
+        ttk.Button(row2, text="Aplicar ao Diagrama",
+                  command=self._apply_tuning).pack(side=tk.LEFT, **pad)
+
+        # Simulação no tempo do diagrama completo (aceita blocos não lineares)
+        sim_frame = ttk.LabelFrame(frame, text="Simulação (degrau nas entradas)")
+        sim_frame.pack(fill=tk.X, **pad)
+        ttk.Label(sim_frame, text="t final (s):").pack(side=tk.LEFT, **pad)
+        self.e_sim_tf = ttk.Entry(sim_frame, width=8)
+        self.e_sim_tf.pack(side=tk.LEFT, **pad)
+        ttk.Label(sim_frame, text="dt (s):").pack(side=tk.LEFT, **pad)
+        self.e_sim_dt = ttk.Entry(sim_frame, width=8)
+        self.e_sim_dt.pack(side=tk.LEFT, **pad)
+        ttk.Label(sim_frame, text="Nós:").pack(side=tk.LEFT, **pad)
+        self.e_sim_nodes = ttk.Entry(sim_frame, width=20)
+        self.e_sim_nodes.pack(side=tk.LEFT, **pad)
+        ttk.Button(sim_frame, text="Simular",
+                  command=self._on_simulate).pack(side=tk.LEFT, **pad)
+
         # Resultado dos cálculos
         self.fig_tf = plt.Figure(figsize=(5,1.5), facecolor='white')
         self.ax_tf = self.fig_tf.add_subplot(111); self.ax_tf.axis('off')
@@ -626,18 +882,35 @@ class BlockDiagramAcadApp:
         self.canvas_tf = FigureCanvasTkAgg(self.fig_tf, master=frame)
         self.canvas_tf.get_tk_widget().pack(fill=tk.X, **pad)
 
+        # Margens de estabilidade (lidas do cache de frequência) e progresso das tarefas
+        status = ttk.Frame(frame)
+        status.pack(fill=tk.X, **pad)
+        self.lbl_margins = ttk.Label(status, text="Margens: —")
+        self.lbl_margins.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.btn_cancel = ttk.Button(status, text="✖ Cancelar", command=self._on_cancel_tasks)
+        self.btn_cancel.pack(side=tk.RIGHT, padx=5)
+        self.btn_cancel.state(['disabled'])
+        self.progress = ttk.Progressbar(status, orient=tk.HORIZONTAL, length=150, mode='determinate')
+        self.progress.pack(side=tk.RIGHT, padx=5)
+        self.lbl_task = ttk.Label(status, text="")
+        self.lbl_task.pack(side=tk.RIGHT, padx=5)
+
         # Gráficos de análise
+        # Eixos de cada visão são criados uma vez e atualizados no lugar
         self.fig_plot = plt.Figure(figsize=(5,3), facecolor='white')
-        self.ax_plot = self.fig_plot.add_subplot(111)
-        self.ax_plot.set_facecolor('white')
-        for spine in self.ax_plot.spines.values():
-            spine.set_color('#0A2667')
-        self.ax_plot.tick_params(axis='x', colors='#0A2667')
-        self.ax_plot.tick_params(axis='y', colors='#0A2667')
-        self.ax_plot.yaxis.label.set_color('#0A2667')
-        self.ax_plot.xaxis.label.set_color('#0A2667')
-        self.ax_plot.title.set_color('#0A2667')
+        self.views = AnalysisViews(self.fig_plot, {
+            'bode': self._build_view_bode,
+            'nyquist': self._build_view_nyquist,
+            'nichols': self._build_view_nichols,
+            'sweep': self._build_view_sweep,
+            'step': self._build_view_step,
+            'sim': self._build_view_sim,
+            'mc': self._build_view_mc,
+            'tune': self._build_view_tune,
+        })
         self.canvas_plot = FigureCanvasTkAgg(self.fig_plot, master=frame)
+        toolbar = NavigationToolbar2Tk(self.canvas_plot, frame, pack_toolbar=False)
+        toolbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.canvas_plot.get_tk_widget().pack(fill=tk.BOTH, expand=True, **pad)
 
     def _get_tf_from_entries(self, num_entry, den_entry):
@@ -721,68 +994,182 @@ class BlockDiagramAcadApp:
         self.ax_tf.set_facecolor('white')
         self.canvas_tf.draw()
 
+    def _apply_io(self):
+        """Lê entradas, saídas e valores de parâmetros da aba Entrada e aplica ao diagrama."""
+        inputs = [n.strip() for n in self.e_inputs.get().split(',') if n.strip()]
+        outputs = [n.strip() for n in self.e_outputs.get().split(',') if n.strip()]
+        self.bd.set_io(inputs, outputs)
+        params = {}
+        for item in self.e_params.get().split(','):
+            if item.strip():
+                name, _, value = item.partition('=')
+                try:
+                    params[name.strip()] = float(value)
+                except ValueError:
+                    raise ValueError(f"Valor de parâmetro inválido: {item.strip()}")
+        self.bd.params = params
+        self.bd.c2d_method = self.cb_c2d.get() or 'zoh'
+        self.bd.pade_order = int(self.cb_pade.get() or 3)
+
+    def _diagram_key(self):
+        """Assinatura do diagrama atual (hash canônico) para coalescer tarefas."""
+        return self.bd.canonical_hash()
+
+    def _on_task_progress(self, key, fraction, message):
+        """Mostra o progresso da tarefa em segundo plano (thread principal)."""
+        self.progress.config(mode='determinate')
+        self.progress['value'] = 100 * fraction
+        self.btn_cancel.state(['!disabled'])
+        self.lbl_task.config(text=message or "Calculando...")
+
+    def _on_tasks_idle(self):
+        self.progress['value'] = 0
+        self.btn_cancel.state(['disabled'])
+        self.lbl_task.config(text="")
+
+    def _on_task_error(self, e):
+        messagebox.showerror("Erro", str(e))
+
+    def _on_cancel_tasks(self):
+        self.executor.cancel()
+        self.lbl_task.config(text="Cancelando...")
+
+    def _on_close(self):
+        self.executor.shutdown()
+        if self.store is not None:
+            self.store.close()
+        self.root.destroy()
+
     def _on_calc(self):
         try:
-            tf = self.bd.reduce()
-            self.current_tf = tf
+            self._apply_io()
+            signature = self._diagram_key()
         except Exception as e:
             return messagebox.showerror("Erro", str(e))
-
-        num, den = tf.num[0][0], tf.den[0][0]
-        ne = sum(c*s_sym**i for i, c in enumerate(reversed(num)))
-        de = sum(c*s_sym**i for i, c in enumerate(reversed(den)))
-        tex = sp.latex(sp.simplify(ne/de))
-
+        bd = self.bd.copy()
+        self.executor.submit('calc', _task_reduce, bd, self.store,
+                             on_done=lambda result: self._show_reduction(result, bd),
+                             on_error=self._on_task_error,
+                             signature=signature)
+
+    def _show_reduction(self, result, bd=None):
+        tfm, tex = result
+        if bd is not None and bd.plan is not None:
+            # Guarda o plano de redução para que a próxima edição recalcule só o necessário
+            self.bd.plan = bd.plan
+        self.current_bd = bd
+        self.current_tfm = tfm
+        self.current_tex = tex
+        channels = [f"{u}→{y}" for (y, u) in tfm]
+        self.cb_channel.config(values=channels)
+        if self.cb_channel.get() not in channels:
+            self.cb_channel.set(channels[0])
+        self._on_channel_selected()
+        if bd is not None:
+            # As margens são do diagrama (laços abertos), não de um canal em malha fechada
+            grid = grid_for(next(iter(tfm.values())), DEFAULT_GRID)
+            self.executor.submit('margins', _task_loop_margins, bd, grid,
+                                 on_done=self._show_margins, on_error=self._on_task_error,
+                                 signature=(bd.canonical_hash(), grid))
+
+    def _on_channel_selected(self, event=None):
+        """Seleciona o canal (entrada→saída) da matriz de transferência a analisar."""
+        if not self.current_tfm:
+            return
+        u, y = self.cb_channel.get().split("→")
+        tf = self.current_tfm[(y, u)]
+        self.current_tf = tf
+        self.full_tf = None
+        self.lbl_mor.config(text="")
+
+        tex = self.current_tex[(y, u)]
+
+        var = 'z' if is_discrete(tf) else 's'
+        label = f"G({var})" if len(self.current_tfm) == 1 else f"G_{{{y},{u}}}({var})"
+        # Com atrasos contínuos a TF exibida é a aproximação de Padé
+        rel = r"\approx" if self._delay_channel() is not None and not is_discrete(tf) else "="
+        self._show_equation(f"${label}{rel}{tex}$")
+        if self.var_mor.get():
+            self._apply_order_reduction()
+
+    def _show_equation(self, text):
         self.ax_tf.clear()
-        self.ax_tf.text(0.1, 0.5, f"$G(s)={tex}$", size=14, color='#0A2667')
+        self.ax_tf.text(0.1, 0.5, text, size=14, color='#0A2667')
         self.ax_tf.axis('off')
         self.ax_tf.set_facecolor('white')
         self.canvas_tf.draw()
 
-    def _plot_bode(self):
-        if not hasattr(self, 'current_tf') or self.current_tf is None:
+    def _apply_order_reduction(self):
+        """Reduz a ordem do canal atual (ordem pedida ou erro máximo) fora da thread do Tk."""
+        full = self.full_tf if self.full_tf is not None else self.current_tf
+        if full is None:
             return messagebox.showwarning("Aviso", "Calcule G(s) primeiro!")
-            
-        self.fig_plot.clf()
-        self.fig_plot.patch.set_facecolor('white')
-        
-        # Cria subplots para magnitude e fase
-        ax1 = self.fig_plot.add_subplot(211)
-        ax2 = self.fig_plot.add_subplot(212)
-        
-        # Configura cores dos eixos
-        for ax in [ax1, ax2]:
-            ax.set_facecolor('white')
-            for spine in ax.spines.values():
-                spine.set_color('#0A2667')
-            ax.tick_params(axis='x', colors='#0A2667')
-            ax.tick_params(axis='y', colors='#0A2667')
-            ax.yaxis.label.set_color('#0A2667')
-            ax.xaxis.label.set_color('#0A2667')
-            ax.title.set_color('#0A2667')
-        
-        # Plota o diagrama de Bode com cor azul
-        ctl.bode_plot(self.current_tf, dB=True, Hz=False, deg=True, 
-                     omega_limits=(0.1, 1000), ax=(ax1, ax2),
-                     color='#3A5FCD')  # Azul médio
-        
-        ax1.set_title('Diagrama de Bode')
-        ax1.grid(True, which='both', linestyle='--', alpha=0.7, color='#D6E4FF')
-        ax2.grid(True, which='both', linestyle='--', alpha=0.7, color='#D6E4FF')
-        
-        self.fig_plot.tight_layout()
-        self.canvas_plot.draw()
+        try:
+            order = self.e_mor_order.get().strip()
+            tol = self.e_mor_tol.get().strip().replace(',', '.')
+            order = int(order) if order else None
+            tol = float(tol) if tol else None
+            if order is None and tol is None:
+                raise ValueError("Informe a ordem ou o erro máximo da redução.")
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        self.executor.submit('mor', _task_order_reduction, full, order, tol,
+                             on_done=lambda result: self._show_order_reduction(full, result),
+                             on_error=self._on_task_error,
+                             signature=(tf_hash(full), order, tol))
+
+    def _show_order_reduction(self, full, result):
+        """Passa a analisar o modelo reduzido, guardando o completo para comparação."""
+        tf_r, bound, tex = result
+        self.full_tf, self.current_tf = full, tf_r
+        n, r = len(full.den[0][0]) - 1, len(tf_r.den[0][0]) - 1
+        self.lbl_mor.config(text=f"Ordem {n} → {r}   |   ‖G − Gr‖∞ ≤ {bound:.3g}")
+        var = 'z' if is_discrete(tf_r) else 's'
+        self._show_equation(f"$G_r({var})={tex}$")
+
+    def _reference(self):
+        """Modelo completo para comparação (quando a redução de ordem está ativa e o toggle ligado)."""
+        return self.full_tf if self.full_tf is not None and self.var_compare.get() else None
+
+    def _delay_channel(self):
+        """Canal atual avaliado exatamente (ExactChannel) se o diagrama tem atrasos; senão None."""
+        if self.current_bd is None or not self.current_bd.has_delays() or self.full_tf is not None:
+            return None
+        u, y = self.cb_channel.get().split("→")
+        return ExactChannel(self.current_bd, y, u)
+
+    def _submit_freq(self, view, render):
+        """Obtém a resposta em frequência de current_tf (do cache) fora da thread do Tk."""
+        # Atrasos entram como e^{-jωT} exato, não pelo Padé de current_tf
+        tf = self._delay_channel() or self.current_tf
+        reference = self._reference()
+        self.executor.submit(view, _task_freq, self.freq_cache, tf,
+                             grid_for(tf, DEFAULT_GRID), reference,
+                             on_done=lambda result: render(*result), on_error=self._on_task_error,
+                             signature=(tf_hash(tf), reference is not None and tf_hash(reference)))
+
+    def _show_margins(self, m):
+        """Exibe as margens de malha (pior laço do diagrama) no rótulo da aba Análise."""
+        if m is None:
+            return self.lbl_margins.config(text="Margens de malha: diagrama sem laços")
+        if m['gm_db'] is None:
+            gm = "MG = ∞"
+        else:
+            gm = f"MG = {m['gm_db']:.2f} dB (ω = {m['w_pc']:.3g} rad/s)"
+        if m['pm_deg'] is None:
+            pm = "MF = ∞"
+        else:
+            pm = f"MF = {m['pm_deg']:.2f}° (ω = {m['w_gc']:.3g} rad/s)"
+        self.lbl_margins.config(text=f"Margens de malha: {gm}   |   {pm}")
 
-    def _plot_step(self):
+    def _plot_bode(self):
         if not hasattr(self, 'current_tf') or self.current_tf is None:
             return messagebox.showwarning("Aviso", "Calcule G(s) primeiro!")
-            
-        self.fig_plot.clf()
-        self.fig_plot.patch.set_facecolor('white')
-        ax = self.fig_plot.add_subplot(111)
+        self._submit_freq('plot', self._render_bode)
+
+    def _style_axes(self, ax):
+        """Aplica as cores do tema a um eixo (uma única vez, na criação da visão)."""
         ax.set_facecolor('white')
-        
-        # Configura cores dos eixos
         for spine in ax.spines.values():
             spine.set_color('#0A2667')
         ax.tick_params(axis='x', colors='#0A2667')
@@ -790,19 +1177,384 @@ class BlockDiagramAcadApp:
         ax.yaxis.label.set_color('#0A2667')
         ax.xaxis.label.set_color('#0A2667')
         ax.title.set_color('#0A2667')
-        
-        # Calcula a resposta ao degrau
-        T, y = ctl.step_response(self.current_tf)
-        
-        # Plota a resposta em azul
-        ax.plot(T, y, color='#3A5FCD', linewidth=2)
+        ax.grid(True, which='both', linestyle='--', alpha=0.7, color='#D6E4FF')
+
+    def _build_view_bode(self, fig):
+        ax1 = fig.add_subplot(211)
+        ax2 = fig.add_subplot(212, sharex=ax1)
+        for ax in (ax1, ax2):
+            self._style_axes(ax)
+            ax.set_xscale('log')
+        ax1.set_title('Diagrama de Bode')
+        ax1.set_ylabel("Magnitude (dB)")
+        ax2.set_ylabel("Fase (graus)")
+        ax2.set_xlabel("Frequência (rad/s)")
+        mag, = ax1.plot([], [], color='#3A5FCD')  # Azul médio
+        phase, = ax2.plot([], [], color='#3A5FCD')
+        # Modelo completo (comparação com o de ordem reduzida)
+        mag_ref, = ax1.plot([], [], color='gray', linestyle='--')
+        phase_ref, = ax2.plot([], [], color='gray', linestyle='--')
+        return {'axes': (ax1, ax2), 'mag': DecimatedLine(mag), 'phase': DecimatedLine(phase),
+                'mag_ref': DecimatedLine(mag_ref), 'phase_ref': DecimatedLine(phase_ref)}
+
+    def _render_bode(self, data, ref=None):
+        v = self.views.show('bode')
+        v['mag'].set_data(data.omega, data.mag_db)
+        v['phase'].set_data(data.omega, data.phase_deg)
+        ref = ref or FrequencyData(np.empty(0), np.empty(0, dtype=complex))
+        v['mag_ref'].set_data(ref.omega, ref.mag_db)
+        v['phase_ref'].set_data(ref.omega, ref.phase_deg)
+        fit_limits(v['axes'][0], data.omega, np.concatenate([data.mag_db, ref.mag_db]))
+        fit_limits(v['axes'][1], data.omega, np.concatenate([data.phase_deg, ref.phase_deg]))
+        self.canvas_plot.draw_idle()
+
+    def _plot_nyquist(self):
+        if not hasattr(self, 'current_tf') or self.current_tf is None:
+            return messagebox.showwarning("Aviso", "Calcule G(s) primeiro!")
+        self._submit_freq('plot', self._render_nyquist)
+
+    def _build_view_nyquist(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
+        ax.set_title("Diagrama de Nyquist")
+        ax.set_xlabel("Re", color='#0A2667')
+        ax.set_ylabel("Im", color='#0A2667')
+        # Ramo para ω > 0 (contínuo) e seu espelho para ω < 0 (tracejado)
+        pos, = ax.plot([], [], color='#3A5FCD', linewidth=2)
+        neg, = ax.plot([], [], color='#3A5FCD', linewidth=1, linestyle='--')
+        ref, = ax.plot([], [], color='gray', linewidth=1, linestyle='--')
+        ax.plot([-1], [0], marker='+', color='red', markersize=12, mew=2)
+        return {'axes': (ax,), 'pos': pos, 'neg': neg, 'ref': ref}
+
+    def _render_nyquist(self, data, ref=None):
+        v = self.views.show('nyquist')
+        re, im = data.response.real, data.response.imag
+        v['pos'].set_data(re, im)
+        v['neg'].set_data(re, -im)
+        v['ref'].set_data(*((ref.response.real, ref.response.imag) if ref else ([], [])))
+        fit_limits(v['axes'][0], np.append(re, -1.0), np.concatenate([im, -im, [0.0]]))
+        self.canvas_plot.draw_idle()
+
+    def _plot_nichols(self):
+        if not hasattr(self, 'current_tf') or self.current_tf is None:
+            return messagebox.showwarning("Aviso", "Calcule G(s) primeiro!")
+        self._submit_freq('plot', self._render_nichols)
+
+    def _build_view_nichols(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
+        ax.set_title("Diagrama de Nichols")
+        ax.set_xlabel("Fase (graus)", color='#0A2667')
+        ax.set_ylabel("Magnitude (dB)", color='#0A2667')
+        line, = ax.plot([], [], color='#3A5FCD', linewidth=2)
+        ref, = ax.plot([], [], color='gray', linewidth=1, linestyle='--')
+        ax.plot([-180], [0], marker='+', color='red', markersize=12, mew=2)
+        return {'axes': (ax,), 'line': line, 'ref': ref}
+
+    def _render_nichols(self, data, ref=None):
+        v = self.views.show('nichols')
+        v['line'].set_data(data.phase_deg, data.mag_db)
+        v['ref'].set_data(*((ref.phase_deg, ref.mag_db) if ref else ([], [])))
+        fit_limits(v['axes'][0], np.append(data.phase_deg, -180.0), np.append(data.mag_db, 0.0))
+        self.canvas_plot.draw_idle()
+
+    def _sweep_grid(self):
+        """Interpreta as faixas de varredura e retorna {parâmetro: array} em grade cartesiana."""
+        names, axes = [], []
+        for item in self.e_sweep.get().split(','):
+            if not item.strip():
+                continue
+            name, _, rng = item.partition('=')
+            parts = rng.split(':')
+            if len(parts) != 3:
+                raise ValueError(f"Faixa inválida: {item.strip()} (use nome=mín:máx:pontos)")
+            names.append(name.strip())
+            axes.append(np.linspace(float(parts[0]), float(parts[1]), int(parts[2])))
+        grids = np.meshgrid(*axes, indexing='ij') if axes else []
+        values = {n: g.ravel() for n, g in zip(names, grids)}
+        # Parâmetros fora da varredura ficam no valor nominal
+        for name, value in self.bd.params.items():
+            values.setdefault(name, value)
+        return values
+
+    def _on_sweep(self):
+        """Polos do canal selecionado sobre toda a grade de parâmetros (uma avaliação vetorizada)."""
+        try:
+            self._apply_io()
+            values = self._sweep_grid()
+        except Exception as e:
+            return messagebox.showerror("Erro", str(e))
+        if self.current_tfm:
+            u, y = self.cb_channel.get().split("→")
+        else:
+            u, y = self.bd.inputs[0], self.bd.outputs[0]
+
+        # A compilação simbólica é reaproveitada enquanto o diagrama não muda
+        key = (u, y, self._diagram_key())
+        compiled = self._compiled[1] if self._compiled[0] == key else None
+        def done(result):
+            self._compiled = (key, result[0])
+            self._render_sweep(result[1])
+        self.executor.submit('plot', _task_sweep, self.bd.copy(), y, u, compiled, values,
+                             on_done=done, on_error=self._on_task_error,
+                             signature=(key, self.e_sweep.get()))
+
+    def _build_view_sweep(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
+        ax.set_xlabel("Re", color='#0A2667')
+        ax.set_ylabel("Im", color='#0A2667')
+        empty = np.empty((0, 2))
+        stable = ax.scatter(empty[:, 0], empty[:, 1], s=2, color='#3A5FCD', alpha=0.3, label='Estável')
+        unstable = ax.scatter(empty[:, 0], empty[:, 1], s=2, color='red', alpha=0.3, label='Instável')
+        ax.axvline(0, color='#0A2667', linewidth=1)
+        ax.legend(loc='best')
+        return {'axes': (ax,), 'stable': stable, 'unstable': unstable}
+
+    def _render_sweep(self, poles):
+        stable = np.all(poles.real < 0, axis=1)
+
+        v = self.views.show('sweep')
+        ok, bad = poles[stable].ravel(), poles[~stable].ravel()
+        v['stable'].set_offsets(np.column_stack([ok.real, ok.imag]))
+        v['unstable'].set_offsets(np.column_stack([bad.real, bad.imag]))
+        ax = v['axes'][0]
+        ax.set_title(f"Polos em {len(stable)} combinações — {100 * stable.mean():.1f}% estáveis")
+        finite = poles[np.isfinite(poles)]
+        fit_limits(ax, np.append(finite.real, 0.0), np.append(finite.imag, 0.0))
+        self.canvas_plot.draw_idle()
+
+    def _plot_step(self):
+        if not hasattr(self, 'current_tf') or self.current_tf is None:
+            return messagebox.showwarning("Aviso", "Calcule G(s) primeiro!")
+        channel = self._delay_channel()
+        if channel is not None:
+            # Atrasos: simulação do diagrama com linha de atraso, sem Padé
+            self.executor.submit('plot', _task_step_delay, channel.bd, channel.output, channel.input,
+                                 on_done=self._render_step, on_error=self._on_task_error,
+                                 signature=('step', channel.key))
+            return
+        reference = self._reference()
+        self.executor.submit('plot', _task_step, self.current_tf, self.store, reference,
+                             on_done=self._render_step, on_error=self._on_task_error,
+                             signature=('step', tf_hash(self.current_tf),
+                                        reference is not None and tf_hash(reference)))
+
+    def _build_view_step(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
         ax.set_title("Resposta ao Degrau")
         ax.set_xlabel("Tempo (s)", color='#0A2667')
         ax.set_ylabel("Saída", color='#0A2667')
-        ax.grid(True, linestyle='--', alpha=0.7, color='#D6E4FF')
-        
-        self.fig_plot.tight_layout()
-        self.canvas_plot.draw()
+        line, = ax.plot([], [], color='#3A5FCD', linewidth=2)
+        ref, = ax.plot([], [], color='gray', linewidth=1, linestyle='--')
+        return {'axes': (ax,), 'line': DecimatedLine(line), 'ref': DecimatedLine(ref)}
+
+    def _render_step(self, result):
+        (T, y, discrete), ref = result
+        v = self.views.show('step')
+        # Respostas longas são reduzidas a ~1 ponto por pixel (LTTB) preservando a forma
+        style = 'steps-post' if discrete else 'default'
+        v['line'].line.set_drawstyle(style)
+        v['line'].set_data(T, np.squeeze(y))
+        T_ref, y_ref = (ref[0], np.squeeze(ref[1])) if ref else (np.empty(0), np.empty(0))
+        v['ref'].line.set_drawstyle(style)
+        v['ref'].set_data(T_ref, y_ref)
+        fit_limits(v['axes'][0], np.concatenate([T, T_ref]), np.concatenate([np.squeeze(y), y_ref]))
+        self.canvas_plot.draw_idle()
+
+    def _on_monte_carlo(self):
+        """Sorteia as incertezas e mostra faixas do degrau e a probabilidade de instabilidade."""
+        try:
+            self._apply_io()
+            uncertainty = parse_uncertainty(self.e_mc.get())
+            n = int(self.e_mc_n.get())
+            if n < 2:
+                raise ValueError("Use ao menos 2 amostras.")
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        if self.current_tfm:
+            u, y = self.cb_channel.get().split("→")
+        else:
+            u, y = self.bd.inputs[0], self.bd.outputs[0]
+        workers = os.cpu_count() if self.var_mc_proc.get() else None
+        self.executor.submit('montecarlo', _task_monte_carlo, self.bd.copy(), y, u, uncertainty, n, workers,
+                             on_done=self._render_mc, on_error=self._on_task_error,
+                             signature=(self._diagram_key(), y, u, self.e_mc.get(), n, workers))
+
+    def _build_view_mc(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
+        ax.set_xlabel("Tempo (s)", color='#0A2667')
+        ax.set_ylabel("Saída", color='#0A2667')
+        median, = ax.plot([], [], color='#0A2667', linewidth=2, label='Mediana')
+        return {'axes': (ax,), 'median': median, 'bands': []}
+
+    def _render_mc(self, result):
+        v = self.views.show('mc')
+        ax = v['axes'][0]
+        for band in v['bands']:
+            band.remove()
+        v['bands'].clear()
+        b = result.step_bands
+        if b:
+            v['bands'].append(ax.fill_between(result.t, b[5], b[95], color='#3A5FCD',
+                                              alpha=0.2, label='5–95 %'))
+            v['bands'].append(ax.fill_between(result.t, b[25], b[75], color='#3A5FCD',
+                                              alpha=0.4, label='25–75 %'))
+            v['median'].set_data(result.t, b[50])
+            fit_limits(ax, result.t, np.concatenate([b[5], b[95]]))
+            ax.legend(loc='best')
+        else:
+            v['median'].set_data([], [])
+        ax.set_title(f"Monte Carlo: {result.n} amostras — "
+                     f"P(instabilidade) = {100 * result.p_unstable:.1f}%")
+
+        q = result.margin_percentiles()
+        def fmt(name, unit):
+            p = q[name]
+            return "—" if p is None else f"{p[5]:.1f} / {p[50]:.1f} / {p[95]:.1f}{unit}"
+        self.lbl_margins.config(text=f"Margens de malha (p5/p50/p95): MG = {fmt('gm_db', ' dB')}   |   "
+                                     f"MF = {fmt('pm_deg', '°')}")
+        self.canvas_plot.draw_idle()
+
+    def _on_tune(self):
+        """Sintoniza os controladores escolhidos, mostrando o melhor projeto a cada geração."""
+        def optional(key):
+            txt = self.e_tune[key].get().strip().replace(',', '.')
+            return float(txt) if txt else None
+        try:
+            self._apply_io()
+            controllers = parse_controllers(self.e_tune_ctrl.get())
+            bounds = parse_bounds(self.e_tune_bounds.get())
+            generations = int(self.e_tune_gen.get())
+            if generations < 1:
+                raise ValueError("Use ao menos 1 geração.")
+            objective = next(k for k, label in TUNING_OBJECTIVES.items()
+                             if label == self.cb_tune_obj.get())
+            os_max = optional('os')
+            options = dict(objective=objective,
+                           targets=(10.0 if os_max is None else os_max, optional('ts')),
+                           gm_min=optional('gm'), pm_min=optional('pm'), generations=generations)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        if self.current_tfm:
+            u, y = self.cb_channel.get().split("→")
+        else:
+            u, y = self.bd.inputs[0], self.bd.outputs[0]
+        workers = os.cpu_count() if self.var_tune_proc.get() else None
+        self.executor.submit('tune', _task_tune, self.bd.copy(), y, u, controllers, bounds,
+                             workers, options,
+                             on_done=self._show_tuning, on_partial=self._on_tune_partial,
+                             on_error=self._on_task_error,
+                             signature=(self._diagram_key(), y, u, self.e_tune_ctrl.get(),
+                                        self.e_tune_bounds.get(), workers, repr(options)))
+        # Os resultados parciais aparecem enquanto esta visão estiver à mostra
+        self.views.show('tune')
+        self.canvas_plot.draw_idle()
+
+    def _on_tune_partial(self, result):
+        # Não sobrescreve outra visão aberta durante a sintonia (Degrau, Polos...)
+        if self.views.current == 'tune':
+            self._render_tune(result)
+
+    def _show_tuning(self, result):
+        self.tuning = result
+        self._render_tune(result)
+
+    def _apply_tuning(self):
+        """Grava os controladores sintonizados no diagrama e recalcula G(s)."""
+        if self.tuning is None:
+            return messagebox.showwarning("Aviso", "Execute a sintonia primeiro!")
+        try:
+            self.tuning.apply(self.bd)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        for u, v in self.tuning.controllers:
+            self._refresh_block_row(next(e for e in self.bd.edges if e['u'] == u and e['v'] == v))
+        self._graph_stale = True
+        self._on_calc()
+
+    def _build_view_tune(self, fig):
+        ax1 = fig.add_subplot(211)
+        ax2 = fig.add_subplot(212)
+        for ax in (ax1, ax2):
+            self._style_axes(ax)
+        ax1.set_xlabel("Tempo (s)", color='#0A2667')
+        ax1.set_ylabel("Saída", color='#0A2667')
+        ax2.set_xlabel("Geração", color='#0A2667')
+        ax2.set_ylabel("Melhor custo", color='#0A2667')
+        ax2.set_yscale('log')
+        step, = ax1.plot([], [], color='#3A5FCD', linewidth=2)
+        ax1.axhline(1.0, color='gray', linestyle='--', linewidth=1)
+        history, = ax2.plot([], [], color='#0A2667', marker='.')
+        return {'axes': (ax1, ax2), 'step': step, 'history': history}
+
+    def _render_tune(self, result):
+        v = self.views.show('tune')
+        ax1, ax2 = v['axes']
+        v['step'].set_data(result.t, result.y)
+        fit_limits(ax1, result.t, np.append(result.y, 1.0))
+        cost = np.asarray(result.history, dtype=float)
+        gen = np.arange(len(cost))
+        ok = np.isfinite(cost)
+        v['history'].set_data(gen[ok], cost[ok])
+        if ok.any():
+            ax2.set_xlim(0, max(len(cost) - 1, 1))
+            ax2.set_ylim(cost[ok].min() / 2, cost[ok].max() * 2)
+        values = ", ".join(f"{n} = {x:.4g}" for n, x in result.values.items())
+        status = "" if result.feasible else " (restrições não atendidas)"
+        ax1.set_title(f"Melhor projeto{status}: {values}", fontsize=9)
+        m = result.metrics
+        def fmt(name, unit):
+            x = m.get(name)
+            return "∞" if x is None or not np.isfinite(x) else f"{x:.2f}{unit}"
+        self.lbl_margins.config(text=f"Sintonia: MG = {fmt('gm_db', ' dB')}   |   "
+                                     f"MF = {fmt('pm_deg', '°')}   |   custo = {result.cost:.4g}")
+        self.canvas_plot.draw_idle()
+
+    def _on_simulate(self):
+        """Simula o diagrama completo com degraus unitários nas entradas declaradas."""
+        def optional(entry):
+            txt = entry.get().strip().replace(',', '.')
+            return float(txt) if txt else None
+        try:
+            self._apply_io()
+            t_final, dt = optional(self.e_sim_tf), optional(self.e_sim_dt)
+        except ValueError as e:
+            return messagebox.showerror("Erro", str(e))
+        record = [n.strip() for n in self.e_sim_nodes.get().split(',') if n.strip()]
+        self.executor.submit('plot', _task_simulate, self.bd.copy(), dt, t_final, record,
+                             on_done=self._render_sim, on_error=self._on_task_error,
+                             signature=(self._diagram_key(), dt, t_final, tuple(record)))
+
+    def _build_view_sim(self, fig):
+        ax = fig.add_subplot(111)
+        self._style_axes(ax)
+        ax.set_title("Simulação no Tempo")
+        ax.set_xlabel("Tempo (s)", color='#0A2667')
+        ax.set_ylabel("Sinal", color='#0A2667')
+        return {'axes': (ax,), 'lines': []}
+
+    def _render_sim(self, result):
+        t, signals = result
+        v = self.views.show('sim')
+        ax = v['axes'][0]
+        # Uma linha por nó registrado, reaproveitando as já criadas
+        while len(v['lines']) < len(signals):
+            line, = ax.plot([], [], linewidth=2)
+            v['lines'].append(DecimatedLine(line))
+        for line, (name, y) in zip(v['lines'], signals.items()):
+            line.line.set_visible(True)
+            line.line.set_label(name)
+            line.set_data(t, y)
+        for line in v['lines'][len(signals):]:
+            line.line.set_visible(False)
+            line.line.set_label('_oculta')
+        values = np.concatenate(list(signals.values()))
+        fit_limits(ax, t, values)
+        ax.legend(loc='best')
+        self.canvas_plot.draw_idle()
 
     def _export_pdf(self):
         path = filedialog.asksaveasfilename(defaultextension=".pdf",
@@ -810,39 +1562,157 @@ class BlockDiagramAcadApp:
         if not path:
             return
 
-        # Salva as figuras temporariamente
+        # Salva as figuras temporariamente (renderização fica na thread principal)
         import tempfile
         with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp1, \
              tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp2:
-            
             graph_png = tmp1.name
             eq_png = tmp2.name
-            
-            self.fig_graph.savefig(graph_png, dpi=300, bbox_inches='tight', facecolor='white')
-            self.fig_tf.savefig(eq_png, dpi=300, bbox_inches='tight', facecolor='white')
-
-            # Cria o PDF
-            c = pdf_canvas.Canvas(path, pagesize=letter)
-            w, h = letter
-            
-            # Adiciona a equação
-            eq_im = ImageReader(eq_png)
-            ew, eh = eq_im.getSize()
-            scale = min((w * 0.9) / ew, (h * 0.2) / eh)
-            c.drawImage(eq_png, (w - ew*scale)/2, h - eh*scale - 40, 
-                       width=ew*scale, height=eh*scale)
-            
-            # Adiciona o diagrama
-            dg_im = ImageReader(graph_png)
-            gw, gh = dg_im.getSize()
-            scale = min((w * 0.9) / gw, (h * 0.6) / gh)
-            c.drawImage(graph_png, (w - gw*scale)/2, h - eh*scale - gh*scale - 80, 
-                       width=gw*scale, height=gh*scale)
-            
-            c.showPage()
-            c.save()
-
-        messagebox.showinfo("Sucesso", f"PDF salvo em:\n{path}")
+        if self._graph_stale:
+            self._draw_graph()  # O PDF deve trazer o diagrama atual mesmo fora da aba Diagrama
+        self.fig_graph.savefig(graph_png, dpi=300, bbox_inches='tight', facecolor='white')
+        self.fig_tf.savefig(eq_png, dpi=300, bbox_inches='tight', facecolor='white')
+
+        self.executor.submit('pdf', _task_pdf, path, eq_png, graph_png,
+                             on_done=lambda p: messagebox.showinfo("Sucesso", f"PDF salvo em:\n{p}"),
+                             on_error=self._on_task_error)
+
+# Tarefas executadas pelo TaskExecutor fora da thread do Tk: recebem o token
+# (progresso/cancelamento) e cópias dos dados, e nunca tocam em widgets.
+
+def _task_reduce(token, bd, store):
+    """Reduz o diagrama e gera o LaTeX de cada canal (ou os lê do cache persistente)."""
+    key = bd.canonical_hash()
+    cached = store.get(key, 'reduction') if store is not None else None
+    if cached is not None:
+        coeffs, tex = cached
+        tfm = {ch: ctl.TransferFunction(num, den, dt) if dt else ctl.TransferFunction(num, den)
+               for ch, (num, den, dt) in coeffs.items()}
+        return tfm, tex
+
+    token.progress(0.1, "Reduzindo diagrama...")
+    if len(bd.inputs) == 1 and len(bd.outputs) == 1:
+        tfm = {(bd.outputs[0], bd.inputs[0]): bd.reduce()}
+    else:
+        tfm = bd.transfer_matrix()
+    tex = {}
+    for i, (ch, tf) in enumerate(tfm.items()):
+        token.progress(0.5 + 0.5 * i / len(tfm), "Gerando LaTeX...")
+        tex[ch] = _tf_latex(tf)
+    if store is not None:
+        coeffs = {ch: (tf.num[0][0], tf.den[0][0], tf.dt if is_discrete(tf) else 0)
+                  for ch, tf in tfm.items()}
+        store.put(key, 'reduction', (coeffs, tex))
+    return tfm, tex
+
+def _task_freq(token, cache, tf, grid, reference=None):
+    """Resposta em frequência (via cache compartilhado); e a do modelo de referência."""
+    token.progress(0.2, "Resposta em frequência...")
+    data = cache.get(tf, grid)
+    return data, (cache.get(reference, grid) if reference is not None else None)
+
+def _task_loop_margins(token, bd, grid):
+    """Piores margens entre os laços do diagrama (None se não houver laços)."""
+    if not bd._loop_edges():
+        return None
+    token.progress(0.2, "Margens de malha...")
+    wmin, wmax, n = grid
+    return bd.loop_margins(np.logspace(np.log10(wmin), np.log10(wmax), int(n)))
+
+def _task_step(token, tf, store, reference=None):
+    """Resposta ao degrau de tf (e do modelo de referência, se houver)."""
+    token.progress(0.2, "Simulando degrau...")
+    ref = _step_result(reference, store)[:2] if reference is not None else None
+    return _step_result(tf, store), ref
+
+def _step_result(tf, store):
+    """Resposta ao degrau: filtro IIR para TFs discretas, python-control para contínuas."""
+    key = tf_hash(tf)
+    cached = store.get(key, 'step') if store is not None else None
+    if cached is not None:
+        return cached
+    if is_discrete(tf):
+        T, y = DiscreteSimulator(tf).step(default_horizon(tf))
+        result = (T, y, True)
+    else:
+        T, y = ctl.step_response(tf)
+        result = (T, y, False)
+    if store is not None:
+        store.put(key, 'step', result)
+    return result
+
+def _task_step_delay(token, bd, output, input):
+    """Resposta ao degrau de um canal com atrasos, simulando o diagrama completo."""
+    token.progress(0.0, "Simulando degrau...")
+    sim = bd.simulator(record=[output])
+    lti = [bd._edge_tf(e) for e in bd.edges if e.get('nl') is None and e.get('delay') is None]
+    t_final = default_timing(lti)[1] if lti else 100 * sim.dt
+    t_final += sum(e['delay'] for e in bd.edges if e.get('delay') is not None)
+    t, signals = sim.run(t_final, {input: 1.0}, progress=lambda f: token.progress(f, "Simulando degrau..."))
+    return (t, signals[output], bool(bd.sample_time())), None
+
+def _task_order_reduction(token, tf, order, tol):
+    """Truncamento balanceado do canal e LaTeX do modelo reduzido."""
+    token.progress(0.2, "Reduzindo ordem...")
+    tf_r, bound, _ = balanced_truncation(tf, order=order, tol=tol)
+    return tf_r, bound, _tf_latex(tf_r)
+
+def _task_sweep(token, bd, output, input, compiled, values):
+    """Compila (se preciso) o canal e calcula os polos na grade de parâmetros."""
+    if compiled is None:
+        token.progress(0.1, "Redução simbólica...")
+        compiled = bd.compile(output, input)
+    token.progress(0.6, "Calculando polos...")
+    return compiled, compiled.poles(**values)
+
+def _task_monte_carlo(token, bd, output, input, uncertainty, n, workers):
+    """Redução simbólica única e avaliação em lote das amostras (opcionalmente em processos)."""
+    token.progress(0.0, "Redução simbólica...")
+    return run_monte_carlo(bd, output, input, uncertainty, n=n, workers=workers,
+                           progress=lambda f: token.progress(f, "Monte Carlo..."))
+
+def _task_tune(token, bd, output, input, controllers, bounds, workers, options):
+    """Sintonia em lote; publica o melhor projeto de cada geração como resultado parcial."""
+    token.progress(0.0, "Redução simbólica...")
+    def progress(fraction, best):
+        token.progress(fraction, f"Sintonia: melhor custo {best.cost:.4g}")
+        token.partial(best)
+    return tune(bd, output, input, controllers, bounds, workers=workers, progress=progress, **options)
+
+def _task_simulate(token, bd, dt, t_final, record):
+    """Compila e simula o diagrama completo com degraus unitários nas entradas."""
+    token.progress(0.0, "Compilando simulação...")
+    sim = bd.simulator(dt, record or None)
+    if t_final is None:
+        lti = [bd._edge_tf(e) for e in bd.edges if e.get('nl') is None and e.get('delay') is None]
+        t_final = default_timing(lti)[1] if lti else 100 * sim.dt
+        t_final += sum(e['delay'] for e in bd.edges if e.get('delay') is not None)
+    steps = {n: 1.0 for n in bd.inputs}
+    return sim.run(t_final, steps, progress=lambda f: token.progress(f, "Simulando..."))
+
+def _task_pdf(token, path, eq_png, graph_png):
+    """Monta o PDF a partir das imagens já renderizadas."""
+    token.progress(0.3, "Gerando PDF...")
+    c = pdf_canvas.Canvas(path, pagesize=letter)
+    w, h = letter
+    
+    # Adiciona a equação
+    eq_im = ImageReader(eq_png)
+    ew, eh = eq_im.getSize()
+    scale = min((w * 0.9) / ew, (h * 0.2) / eh)
+    c.drawImage(eq_png, (w - ew*scale)/2, h - eh*scale - 40, 
+               width=ew*scale, height=eh*scale)
+    
+    # Adiciona o diagrama
+    dg_im = ImageReader(graph_png)
+    gw, gh = dg_im.getSize()
+    scale = min((w * 0.9) / gw, (h * 0.6) / gh)
+    c.drawImage(graph_png, (w - gw*scale)/2, h - eh*scale - gh*scale - 80, 
+               width=gw*scale, height=gh*scale)
+    
+    c.showPage()
+    c.save()
+    return path
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1 @@
+# Permite que os testes em tests/ importem os módulos da raiz do projeto.
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Atrasos de transporte e^{-sT}: avaliação exata, aproximantes de Padé e linha de atraso."""
+
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+import control as ctl
+
+# Ordens de Padé oferecidas na interface (numerador e denominador de mesmo grau)
+PADE_ORDERS = (1, 2, 3, 4, 5, 6)
+
+
+@lru_cache(maxsize=256)
+def pade(T, order):
+    """Coeficientes (num, den) do aproximante de Padé de e^{-sT}, em cache por (T, ordem)."""
+    num, den = ctl.pade(float(T), int(order))
+    return tuple(num), tuple(den)
+
+
+def delay_tf(T, order=3, dt=0):
+    """Modelo racional do atraso: Padé em s ou, com Ts, o atraso exato z^{-n} (T múltiplo de Ts)."""
+    if T < 0:
+        raise ValueError("O atraso deve ser não negativo.")
+    if dt:
+        n = int(round(T / dt))
+        if not np.isclose(n * dt, T):
+            raise ValueError(f"Atraso {T} não é múltiplo do tempo de amostragem {dt}.")
+        return ctl.TransferFunction([1.0], [1.0] + [0.0] * n, dt)
+    if T == 0:
+        return ctl.TransferFunction([1.0], [1.0])
+    return ctl.TransferFunction(*pade(T, order))
+
+
+class DelayLine:
+    """Linha de atraso em buffer circular para simulação com passo fixo dt.
+
+    Atrasos que não são múltiplos de dt são interpolados linearmente entre
+    as duas amostras vizinhas; T deve ser de ao menos um passo.
+    """
+    def __init__(self, T, dt):
+        steps = T / dt
+        if steps < 1 - 1e-9:
+            raise ValueError(f"Atraso {T} menor que o passo de simulação {dt}.")
+        self.n = max(int(np.floor(steps + 1e-9)), 1)
+        self.frac = max(steps - self.n, 0.0)
+        self.buf = np.zeros(self.n + 1)
+        self.pos = 0  # Amostra mais antiga (k - n - 1)
+
+    def reset(self):
+        self.buf[:] = 0.0
+        self.pos = 0
+
+    def read(self):
+        """Saída no passo atual: entrada de n (+ frac) passos atrás."""
+        m = self.n + 1
+        return (1.0 - self.frac) * self.buf[(self.pos + 1) % m] + self.frac * self.buf[self.pos]
+
+    def write(self, x):
+        """Grava a entrada do passo atual (sobrescreve a amostra mais antiga)."""
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % (self.n + 1)
+
+
+class ExactChannel:
+    """Canal (saída, entrada) de um diagrama com atrasos, avaliado exatamente em frequência.
+
+    Tem a mesma interface usada pelo FrequencyCache (key, dt e evaluate), de
+    modo que Bode, Nyquist, Nichols e margens usam e^{-jωT} sem Padé.
+    """
+    def __init__(self, bd, output, input):
+        self.bd = bd
+        self.output, self.input = output, input
+        self.key = hashlib.sha1(repr((bd.canonical_hash(), output, input)).encode()).hexdigest()
+        self.dt = bd.sample_time()
+
+    def evaluate(self, omega):
+        return self.bd.frequency_response(omega)[(self.output, self.input)]
@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Modelo do diagrama de blocos e biblioteca de subsistemas, sem dependências de interface gráfica."""
+
+import hashlib
+
+import control as ctl
+import numpy as np
+import sympy as sp
+from scipy import linalg, signal
+
+from freq import FrequencyData, evaluate, tf_hash
+from delay import delay_tf
+from reduction import ReductionPlan
+from simulation import DiagramSimulator, nonlinear_spec
+from symbolic import CompiledTransfer, free_parameters, poly_expr
+from discrete import common_sample_time, harmonize, is_discrete
+
+# Símbolo de Laplace para Sympy
+s_sym = sp.symbols('s')
+# Símbolo da transformada Z (blocos discretos)
+z_sym = sp.symbols('z')
+
+def _poly_latex(num, den, var=s_sym):
+    """LaTeX simplificado de num/den (coeficientes em potências decrescentes de var)."""
+    ne = sum(c*var**i for i, c in enumerate(reversed(num)))
+    de = sum(c*var**i for i, c in enumerate(reversed(den)))
+    return sp.latex(sp.simplify(ne/de))
+
+def _tf_latex(tf):
+    """LaTeX de uma TF SISO, em z quando discreta e em s quando contínua."""
+    return _poly_latex(tf.num[0][0], tf.den[0][0], z_sym if is_discrete(tf) else s_sym)
+
+def _sign_value(sign):
+    """Converte o sinal cadastrado ('+' ou '-') para o valor numérico do python-control."""
+    return -1 if str(sign).strip() == '-' else 1
+
+class BlockDiagram:
+    """Armazena os blocos e reduz o diagrama."""
+    def __init__(self, inputs=('input',), outputs=('output',)):
+        self.edges = []
+        self.feedback_signs = {}  # Sinal de cada bloco no somador do nó de destino
+        self.inputs = list(inputs)    # Nós de entrada declarados (referência, perturbações...)
+        self.outputs = list(outputs)  # Nós de saída declarados (medições)
+        self.library = None  # SubsystemLibrary usada para resolver blocos de subsistema
+        self.c2d_method = 'zoh'  # Discretização dos blocos contínuos em diagramas mistos
+        self.params = {}  # Valores nominais dos parâmetros simbólicos (nome -> float)
+        self.pade_order = 3  # Ordem do Padé dos atrasos onde um modelo racional é necessário
+        self.plan = None  # ReductionPlan da última redução (reaproveitado ao editar coeficientes)
+
+    def set_io(self, inputs, outputs):
+        """Declara os nós de entrada e de saída do diagrama."""
+        inputs, outputs = list(inputs), list(outputs)
+        if not inputs or not outputs:
+            raise ValueError("Declare ao menos uma entrada e uma saída.")
+        self.inputs, self.outputs = inputs, outputs
+
+    def _append_edge(self, u: str, v: str, sign='+', **fields):
+        """Acrescenta a aresta u→v (recusa duplicatas) e registra seu sinal."""
+        for edge in self.edges:
+            if edge['u'] == u and edge['v'] == v:
+                raise ValueError(f"Bloco {u}→{v} já existe!")
+
+        self.edges.append({'u': u, 'v': v, **fields})
+        self.feedback_signs[(u, v)] = sign
+
+    def _edge_sign(self, key):
+        """Sinal (±1) com que o bloco key entra no somador do nó de destino."""
+        return _sign_value(self.feedback_signs.get(key, '+'))
+
+    def add_block(self, u: str, v: str, tf: ctl.TransferFunction, sign='+'):
+        self._append_edge(u, v, sign, tf=tf)
+
+    def add_subsystem(self, u: str, v: str, name: str, sign='+'):
+        """Adiciona um bloco u→v cuja TF é a redução do subsistema 'name' da biblioteca."""
+        if self.library is None or name not in self.library.definitions:
+            raise ValueError(f"Subsistema '{name}' não definido!")
+        self._append_edge(u, v, sign, tf=None, sub=name)
+
+    def add_parametric_block(self, u: str, v: str, num, den, sign='+'):
+        """Adiciona um bloco cujos coeficientes podem ser expressões em parâmetros (ex.: K, tau)."""
+        self._append_edge(u, v, sign, tf=None, expr=(tuple(num), tuple(den)))
+
+    def add_delay_block(self, u: str, v: str, T: float, sign='+'):
+        """Adiciona um atraso de transporte e^{-sT} (exato em frequência e na simulação)."""
+        if T <= 0:
+            raise ValueError("O atraso deve ser positivo.")
+        self._append_edge(u, v, sign, tf=None, delay=float(T))
+
+    def set_coefficients(self, u: str, v: str, num, den, Ts=0):
+        """Troca os coeficientes do bloco u→v, mantendo o sinal e a posição no diagrama.
+
+        Como a topologia não muda, a próxima redução recalcula apenas os
+        passos que dependem deste bloco (ver ReductionPlan).
+        """
+        edge = next((e for e in self.edges if e['u'] == u and e['v'] == v), None)
+        if edge is None:
+            raise ValueError(f"Bloco {u}→{v} não existe!")
+        if edge.get('tf') is None and edge.get('expr') is None:
+            raise ValueError(f"O bloco {u}→{v} não tem coeficientes editáveis.")
+        if all(isinstance(c, (int, float)) for c in list(num) + list(den)):
+            tf = ctl.TransferFunction(num, den, Ts) if Ts else ctl.TransferFunction(num, den)
+            edge.pop('expr', None)
+            edge['tf'] = tf
+        elif Ts:
+            raise ValueError("Parâmetros simbólicos são suportados apenas em blocos contínuos.")
+        else:
+            edge['tf'] = None
+            edge['expr'] = (tuple(num), tuple(den))
+
+    def has_delays(self):
+        return any(e.get('delay') is not None for e in self.edges)
+
+    def add_nonlinear_block(self, u: str, v: str, kind: str, sign='+', **params):
+        """Adiciona um bloco não linear (saturation, deadzone, ratelimit), usado só na simulação."""
+        self._append_edge(u, v, sign, tf=None, nl=nonlinear_spec(kind, params))
+
+    def parameters(self):
+        """Nomes dos parâmetros simbólicos usados nos blocos."""
+        exprs = [c for e in self.edges if e.get('expr') for part in e['expr'] for c in part]
+        return [p.name for p in free_parameters(exprs)]
+
+    def copy(self):
+        """Cópia independente da estrutura (as TFs e a biblioteca são compartilhadas)."""
+        bd = BlockDiagram(self.inputs, self.outputs)
+        bd.edges = [dict(e) for e in self.edges]
+        bd.feedback_signs = dict(self.feedback_signs)
+        bd.library = self.library
+        bd.c2d_method = self.c2d_method
+        bd.params = dict(self.params)
+        bd.pade_order = self.pade_order
+        bd.plan = self.plan  # Os planos são imutáveis: update() cria um novo
+        return bd
+
+    def canonical_hash(self, _stack=()):
+        """Hash canônico do diagrama: E/S, arestas, sinais, coeficientes e parâmetros.
+
+        Não depende da ordem de inserção dos blocos; blocos de subsistema
+        entram com o hash de conteúdo do subsistema.
+        """
+        h = hashlib.sha1()
+        h.update(repr((self.inputs, self.outputs, self.c2d_method,
+                       sorted(self.params.items()), self.pade_order)).encode())
+        for e in sorted(self.edges, key=lambda e: (e['u'], e['v'])):
+            key = (e['u'], e['v'])
+            h.update(repr((key, self.feedback_signs.get(key))).encode())
+            if e.get('sub') is not None:
+                if self.library is None:
+                    raise ValueError(f"Subsistema '{e['sub']}' sem biblioteca associada.")
+                h.update(self.library.content_hash(e['sub'], _stack).encode())
+            elif e.get('expr') is not None:
+                h.update(repr(e['expr']).encode())
+            elif e.get('nl') is not None:
+                h.update(repr(e['nl']).encode())
+            elif e.get('delay') is not None:
+                h.update(repr(('delay', e['delay'])).encode())
+            else:
+                h.update(tf_hash(e['tf']).encode())
+        return h.hexdigest()
+
+    def _edge_tf(self, e):
+        """TF numérica de um bloco (subsistema resolvido, parâmetros nos valores nominais)."""
+        if e.get('sub') is not None:
+            if self.library is None:
+                raise ValueError(f"Subsistema '{e['sub']}' sem biblioteca associada.")
+            return self.library.tf(e['sub'])
+        if e.get('delay') is not None:
+            return delay_tf(e['delay'], self.pade_order)
+        if e.get('nl') is not None:
+            raise ValueError(f"Bloco não linear {e['u']}→{e['v']} ({e['nl'][0]}) não tem TF: "
+                             "use a simulação no tempo.")
+        if e.get('expr') is not None:
+            num, den = e['expr']
+            subs = {sp.Symbol(k): v for k, v in self.params.items()}
+            try:
+                num = [float(sp.sympify(c).subs(subs)) for c in num]
+                den = [float(sp.sympify(c).subs(subs)) for c in den]
+            except TypeError:
+                missing = [n for n in self.parameters() if n not in self.params]
+                raise ValueError(f"Defina valores para os parâmetros: {', '.join(missing)}")
+            return ctl.TransferFunction(num, den)
+        return e['tf']
+
+    def _edge_expr(self, e):
+        """Expressão simbólica em s de um bloco (parâmetros mantidos como símbolos)."""
+        if e.get('expr') is not None:
+            return poly_expr(*e['expr'])
+        tf = self._edge_tf(e)
+        if is_discrete(tf):
+            raise ValueError("Redução simbólica disponível apenas para blocos contínuos.")
+        return poly_expr(tf.num[0][0], tf.den[0][0])
+
+    def symbolic_transfer(self, output=None, input=None, open_edge=None):
+        """Reduz o diagrama simbolicamente: G(s) de 'input' para 'output' como expressão sympy.
+
+        Com open_edge=(u, v), o bloco u→v é omitido das equações de nó
+        (laço aberto nesse bloco); 'input' pode ser qualquer nó.
+        """
+        output = output or self.outputs[0]
+        input = input or self.inputs[0]
+        nodes = list(dict.fromkeys(self.inputs + self.outputs
+                                   + [n for e in self.edges for n in (e['u'], e['v'])]))
+        idx = {n: i for i, n in enumerate(nodes)}
+
+        M = sp.eye(len(nodes))
+        w = sp.zeros(len(nodes), 1)
+        for e in self.edges:
+            key = (e['u'], e['v'])
+            if key == open_edge:
+                continue
+            M[idx[e['v']], idx[e['u']]] -= self._edge_sign(key) * self._edge_expr(e)
+        w[idx[input]] = 1
+        x = M.LUsolve(w)
+        return sp.cancel(sp.together(x[idx[output]]))
+
+    def loop_transfer(self, u: str, v: str):
+        """Transferência de malha L(s) vista do bloco u→v (convenção 1 + L), ou 0 fora de laços.
+
+        O laço é aberto no bloco: L = −(sinal)·G_uv·H, com H a transferência
+        de v para u no diagrama sem o bloco.
+        """
+        edge = next((e for e in self.edges if e['u'] == u and e['v'] == v), None)
+        if edge is None:
+            raise ValueError(f"Bloco {u}→{v} não existe!")
+        H = self.symbolic_transfer(output=u, input=v, open_edge=(u, v))
+        return sp.cancel(-self._edge_sign((u, v)) * self._edge_expr(edge) * H)
+
+    def compile(self, output=None, input=None) -> CompiledTransfer:
+        """Reduz uma vez e compila G(s) para avaliação vetorizada sobre arrays de parâmetros."""
+        return CompiledTransfer(self.symbolic_transfer(output, input))
+
+    def simulator(self, dt=None, record=None) -> DiagramSimulator:
+        """Compila o diagrama completo (inclusive blocos não lineares) para simulação no tempo."""
+        return DiagramSimulator(self, dt, record)
+
+    def sample_time(self):
+        """Ts comum dos blocos discretos (0 se o diagrama for contínuo); atrasos não contam."""
+        return common_sample_time([self._edge_tf(e) for e in self.edges
+                                   if e.get('delay') is None and e.get('nl') is None])
+
+    def _resolved_edges(self, exact_delays=False):
+        """Arestas com as TFs dos subsistemas já resolvidas (via cache da biblioteca).
+
+        Em diagramas mistos, os blocos contínuos são discretizados (c2d_method)
+        no tempo de amostragem dos blocos em z. Atrasos viram z^{-n} em
+        diagramas discretos e Padé nos contínuos; com exact_delays, os
+        atrasos contínuos ficam como TF unitária com e['delay'] = T.
+        """
+        Ts = self.sample_time() if self.has_delays() else 0
+        edges = []
+        for e in self.edges:
+            if e.get('delay') is None:
+                edges.append(dict(e, tf=self._edge_tf(e)))
+            elif exact_delays and not Ts:
+                edges.append(dict(e, tf=ctl.TransferFunction([1.0], [1.0])))
+            else:
+                edges.append(dict(e, tf=delay_tf(e['delay'], self.pade_order, Ts), delay=None))
+        tfs = harmonize([e['tf'] for e in edges], self.c2d_method)
+        return [dict(e, tf=tf) for e, tf in zip(edges, tfs)]
+
+    def _rational(self, e):
+        """TF racional de uma aresta da redução (atraso pendente aproximado por Padé)."""
+        if not e.get('delay'):
+            return e['tf']
+        return ctl.series(e['tf'], delay_tf(e['delay'], self.pade_order))
+
+    def _merge(self, op, a, b, arg=None):
+        """Combina dois ramos da redução ({'tf', 'delay'}) em série, paralelo ou realimentação.
+
+        Os sinais dos blocos já estão nas TFs dos ramos, então
+        a realimentação é sempre positiva: G/(1 − G·H).
+        """
+        if op == 'series':
+            return {'tf': ctl.series(a['tf'], b['tf']),
+                    'delay': (a.get('delay') or 0) + (b.get('delay') or 0)}
+        if op == 'parallel':
+            if (a.get('delay') or 0) == (b.get('delay') or 0):
+                return {'tf': ctl.parallel(a['tf'], b['tf']), 'delay': a.get('delay')}
+            return {'tf': ctl.parallel(self._rational(a), self._rational(b)), 'delay': None}
+        return {'tf': ctl.feedback(self._rational(a), self._rational(b), sign=1), 'delay': None}
+
+    def _structure(self, edges):
+        """Topologia da redução: tudo o que decide os passos, exceto os coeficientes."""
+        return (tuple(self.inputs), tuple(self.outputs), self.pade_order,
+                tuple(sorted(self.feedback_signs.items())),
+                tuple((e['u'], e['v'], e.get('delay'), getattr(e['tf'], 'dt', 0)) for e in edges))
+
+    def _find_series_blocks(self, edges):
+        """Encontra blocos em série que podem ser reduzidos."""
+        terminals = set(self.inputs) | set(self.outputs)
+        for e1 in edges:
+            node = e1['v']
+            if node in terminals:
+                continue
+            # O nó intermediário deve ter exatamente uma entrada e uma saída
+            incoming = [e for e in edges if e['v'] == node]
+            outgoing = [e for e in edges if e['u'] == node]
+            if len(incoming) == 1 and len(outgoing) == 1 and outgoing[0] is not e1:
+                return e1, outgoing[0]
+        return None, None
+
+    def _find_parallel_blocks(self, edges):
+        """Encontra blocos em paralelo que podem ser reduzidos."""
+        for i in range(len(edges)):
+            for j in range(i+1, len(edges)):
+                e1 = edges[i]
+                e2 = edges[j]
+                if e1['u'] == e2['u'] and e1['v'] == e2['v']:
+                    return e1, e2
+        return None, None
+
+    def _find_feedback_blocks(self, edges):
+        """Encontra blocos em realimentação que podem ser reduzidos."""
+        for i in range(len(edges)):
+            for j in range(len(edges)):
+                if i == j:
+                    continue
+                e1 = edges[i]
+                e2 = edges[j]
+                # Com os sinais já nas TFs, qualquer das duas arestas pode ser o ramo direto
+                if e1['u'] == e2['v'] and e1['v'] == e2['u'] and self._isolated_loop(edges, e1):
+                    return e1, e2
+        return None, None
+
+    def _isolated_loop(self, edges, fwd):
+        """O laço fwd (u→v) + retorno (v→u) só vira um bloco se não tiver outras ligações.
+
+        fwd deve ser a única aresta que chega em v e a única que sai de u;
+        u não pode ser saída (seu sinal deixaria de existir) nem v entrada
+        (a injeção externa em v se perderia).
+        """
+        u, v = fwd['u'], fwd['v']
+        if u in self.outputs or v in self.inputs:
+            return False
+        into_v = [e for e in edges if e['v'] == v]
+        out_of_u = [e for e in edges if e['u'] == u]
+        return len(into_v) == 1 and len(out_of_u) == 1
+
+    def reduce(self) -> ctl.TransferFunction:
+        """Reduz o diagrama de blocos até obter uma única função de transferência.
+
+        Atrasos em série são somados antes de aproximados, de modo que cada
+        caminho recebe um único Padé em vez de um por bloco.
+        """
+        resolved = self._resolved_edges(exact_delays=True)
+        # O sinal de cada bloco entra na TF do ramo, como nas equações de nó
+        leaves = [{'tf': e['tf'] if self._edge_sign((e['u'], e['v'])) > 0 else -e['tf'],
+                   'delay': e.get('delay')} for e in resolved]
+        structure = self._structure(resolved)
+        if self.plan is not None and self.plan.structure == structure:
+            # Mesma topologia: recalcula só os passos a jusante dos blocos alterados
+            self.plan = self.plan.update(leaves, self._merge)
+        else:
+            self.plan = self._build_plan(resolved, leaves, structure)
+        if self.plan.result is not None:
+            return self._rational(self.plan.values[self.plan.result])
+
+        # Se as regras de série/paralelo/realimentação não bastam, resolve o grafo
+        u, v = self.inputs[0], self.outputs[0]
+        try:
+            return self.transfer_matrix(edges=self._resolved_edges())[(v, u)]
+        except (ValueError, KeyError, np.linalg.LinAlgError):
+            pass
+
+        raise ValueError(f"Não foi possível reduzir ({len(self.edges)} blocos). Diagrama muito complexo ou mal formado.")
+
+    def _build_plan(self, resolved, leaves, structure):
+        """Procura os passos série/paralelo/realimentação e os registra num ReductionPlan."""
+        plan = ReductionPlan(structure, leaves)
+        edges = [{'u': e['u'], 'v': e['v'], 'node': k} for k, e in enumerate(resolved)]
+        changed = True
+        while changed and len(edges) > 1:
+            changed = False
+
+            # Tenta reduzir série primeiro
+            e1, e2 = self._find_series_blocks(edges)
+            if e1 and e2:
+                node = plan.add('series', e1['node'], e2['node'], None, self._merge)
+                edges.remove(e1)
+                edges.remove(e2)
+                edges.append({'u': e1['u'], 'v': e2['v'], 'node': node})
+                changed = True
+                continue
+
+            # Tenta reduzir paralelo
+            e1, e2 = self._find_parallel_blocks(edges)
+            if e1 and e2:
+                node = plan.add('parallel', e1['node'], e2['node'], None, self._merge)
+                edges.remove(e1)
+                edges.remove(e2)
+                edges.append({'u': e1['u'], 'v': e1['v'], 'node': node})
+                changed = True
+                continue
+
+            # Tenta reduzir realimentação
+            fwd, fb = self._find_feedback_blocks(edges)
+            if fwd and fb:
+                node = plan.add('feedback', fwd['node'], fb['node'], None, self._merge)
+                edges.remove(fwd)
+                edges.remove(fb)
+                edges.append({'u': fwd['u'], 'v': fwd['v'], 'node': node})
+                changed = True
+                continue
+
+        # Verifica se sobrou apenas um bloco entrada->saída
+        u, v = self.inputs[0], self.outputs[0]
+        if len(edges) == 1 and edges[0]['u'] == u and edges[0]['v'] == v:
+            plan.result = edges[0]['node']
+        return plan
+
+    def _loop_edges(self):
+        """Identifica as arestas de retorno (que fecham laços) por busca em profundidade."""
+        adj = {}
+        for e in self.edges:
+            adj.setdefault(e['u'], []).append(e)
+        state, back = {}, set()
+        for root in self.inputs + [e['u'] for e in self.edges]:
+            if root in state:
+                continue
+            state[root] = 'open'
+            stack = [(root, iter(adj.get(root, [])))]
+            while stack:
+                node, it = stack[-1]
+                e = next(it, None)
+                if e is None:
+                    state[node] = 'done'
+                    stack.pop()
+                elif state.get(e['v']) == 'open':
+                    back.add((e['u'], e['v']))
+                elif e['v'] not in state:
+                    state[e['v']] = 'open'
+                    stack.append((e['v'], iter(adj.get(e['v'], []))))
+        return back
+
+    def frequency_response(self, omega, max_bytes=64 * 1024 * 1024,
+                           inputs=None, outputs=None, open_edge=None) -> dict:
+        """Resposta em frequência exata de todos os canais {(saída, entrada): G(jω)}.
+
+        Resolve os nós em cada ω, com os atrasos avaliados como e^{-jωT}
+        (sem Padé); as frequências são processadas em lotes de até max_bytes.
+        inputs/outputs trocam os nós de entrada e saída declarados e, com
+        open_edge=(u, v), o bloco u→v é omitido (como em symbolic_transfer).
+        """
+        omega = np.asarray(omega, dtype=float)
+        inputs = self.inputs if inputs is None else list(inputs)
+        outputs = self.outputs if outputs is None else list(outputs)
+        edges = self._resolved_edges(exact_delays=True)
+        nodes = list(dict.fromkeys(inputs + outputs
+                                   + [n for e in edges for n in (e['u'], e['v'])]))
+        idx = {n: i for i, n in enumerate(nodes)}
+        N = len(nodes)
+
+        gains = []
+        for e in edges:
+            key = (e['u'], e['v'])
+            if key == open_edge:
+                continue
+            gains.append((idx[e['v']], idx[e['u']], self._edge_sign(key) * self._edge_gain(e, omega)))
+        Q = np.zeros((N, len(inputs)))
+        for j, n in enumerate(inputs):
+            Q[idx[n], j] = 1.0
+
+        X = np.empty((len(omega), N, len(inputs)), dtype=complex)
+        chunk = max(int(max_bytes // (16 * N * N)), 1)
+        for a in range(0, len(omega), chunk):
+            b = min(a + chunk, len(omega))
+            M = np.broadcast_to(np.eye(N, dtype=complex), (b - a, N, N)).copy()
+            for v, u, g in gains:
+                M[:, v, u] -= g[a:b]
+            X[a:b] = np.linalg.solve(M, np.broadcast_to(Q, (b - a, N, len(inputs))))
+        return {(y, u): X[:, idx[y], j] for j, u in enumerate(inputs) for y in outputs}
+
+    @staticmethod
+    def _edge_gain(e, omega):
+        """G(jω) de uma aresta resolvida, com o atraso pendente como e^{-jωT}."""
+        g = evaluate(e['tf'], omega)
+        if e.get('delay'):
+            g = g * np.exp(-1j * omega * e['delay'])
+        return g
+
+    def loop_response(self, u: str, v: str, omega):
+        """L(jω) vista do bloco u→v (convenção 1 + L), como loop_transfer, com atrasos exatos."""
+        edge = next((e for e in self._resolved_edges(exact_delays=True)
+                     if e['u'] == u and e['v'] == v), None)
+        if edge is None:
+            raise ValueError(f"Bloco {u}→{v} não existe!")
+        H = self.frequency_response(omega, inputs=[v], outputs=[u], open_edge=(u, v))[(u, v)]
+        return -self._edge_sign((u, v)) * self._edge_gain(edge, np.asarray(omega, dtype=float)) * H
+
+    def loop_margins(self, omega) -> dict:
+        """Piores margens de ganho e de fase entre os laços abertos nas arestas de retorno.
+
+        Mesmo formato de freq.stability_margins; as entradas ficam None sem
+        laços ou sem cruzamento na grade.
+        """
+        result = {'gm_db': None, 'w_pc': None, 'pm_deg': None, 'w_gc': None}
+        for u, v in sorted(self._loop_edges()):
+            m = FrequencyData(omega, self.loop_response(u, v, omega)).margins()
+            if m['gm_db'] is not None and (result['gm_db'] is None or m['gm_db'] < result['gm_db']):
+                result['gm_db'], result['w_pc'] = m['gm_db'], m['w_pc']
+            if m['pm_deg'] is not None and (result['pm_deg'] is None or m['pm_deg'] < result['pm_deg']):
+                result['pm_deg'], result['w_gc'] = m['pm_deg'], m['w_gc']
+        return result
+
+    def transfer_matrix(self, edges=None) -> dict:
+        """Calcula a matriz de transferência completa {(saída, entrada): TF} numa única passada.
+
+        Cada bloco vira uma realização em espaço de estados; os sinais dos nós
+        satisfazem (I - S·D·P)·x = S·C·ξ + Q·w, e essa matriz é fatorada uma só
+        vez e resolvida contra todas as colunas (estados e entradas) de uma vez.
+        """
+        if edges is None:
+            edges = self._resolved_edges()
+        if not edges:
+            raise ValueError("Diagrama vazio.")
+
+        nodes = list(dict.fromkeys(self.inputs + self.outputs
+                                   + [n for e in edges for n in (e['u'], e['v'])]))
+        idx = {n: i for i, n in enumerate(nodes)}
+        N, E = len(nodes), len(edges)
+
+        dt = common_sample_time([e['tf'] for e in edges])
+        blocks = [ctl.tf2ss(e['tf']) for e in edges]
+        A = linalg.block_diag(*[np.asarray(b.A) for b in blocks])
+        B = linalg.block_diag(*[np.asarray(b.B) for b in blocks])
+        C = linalg.block_diag(*[np.asarray(b.C) for b in blocks])
+        D = np.array([float(np.asarray(b.D).squeeze()) for b in blocks])
+        nx = A.shape[0]
+        B = B.reshape(nx, E)
+        C = C.reshape(E, nx)
+
+        P = np.zeros((E, N))  # entrada de cada bloco = sinal do nó de origem
+        S = np.zeros((N, E))  # cada nó soma as saídas dos blocos que chegam nele
+        for k, e in enumerate(edges):
+            P[k, idx[e['u']]] = 1.0
+            key = (e['u'], e['v'])
+            S[idx[e['v']], k] = self._edge_sign(key)
+        Q = np.zeros((N, len(self.inputs)))
+        for j, n in enumerate(self.inputs):
+            Q[idx[n], j] = 1.0
+        R = np.zeros((len(self.outputs), N))
+        for i, n in enumerate(self.outputs):
+            R[i, idx[n]] = 1.0
+
+        M = np.eye(N) - S @ (D[:, None] * P)
+        lu = linalg.lu_factor(M, check_finite=True)
+        if np.any(np.abs(np.diag(lu[0])) < 1e-12):
+            raise ValueError("Laço algébrico mal-posto: (I - S·D·P) é singular.")
+        X = linalg.lu_solve(lu, np.hstack([S @ C, Q]))
+        Xc, Xq = X[:, :nx], X[:, nx:]
+
+        BP = B @ P
+        A_cl = A + BP @ Xc
+        B_cl = BP @ Xq
+        C_cl = R @ Xc
+        D_cl = R @ Xq
+
+        result = {}
+        for j, u in enumerate(self.inputs):
+            if nx:
+                nums, den = signal.ss2tf(A_cl, B_cl, C_cl, D_cl, input=j)
+            else:
+                nums, den = D_cl[:, j:j+1], np.array([1.0])
+            for i, y in enumerate(self.outputs):
+                num = np.atleast_1d(nums[i]).astype(float)
+                # Descarta resíduos numéricos nos coeficientes de maior grau
+                num[np.abs(num) < 1e-10 * max(np.abs(num).max(), 1.0)] = 0.0
+                num = np.trim_zeros(num, 'f') if np.any(num) else np.array([0.0])
+                result[(y, u)] = ctl.minreal(ctl.TransferFunction(num, den, dt), verbose=False)
+        return result
+
+class SubsystemLibrary:
+    """Subsistemas nomeados, com reduções em cache pelo hash do conteúdo das arestas.
+
+    O hash de um subsistema inclui o hash dos subsistemas que ele usa; assim,
+    redefinir um subsistema invalida apenas ele e os que dependem dele.
+    """
+    def __init__(self):
+        self.definitions = {}  # nome -> BlockDiagram
+        self._cache = {}       # hash de conteúdo -> TF reduzida
+
+    def define(self, name: str, diagram: BlockDiagram):
+        """Cria ou redefine o subsistema 'name'."""
+        if not name:
+            raise ValueError("Nome de subsistema obrigatório.")
+        previous, previous_library = self.definitions.get(name), diagram.library
+        diagram.library = self
+        self.definitions[name] = diagram
+        try:
+            self.content_hash(name)  # Rejeita definições recursivas já na criação
+        except ValueError:
+            # Desfaz tudo: a definição anterior (ou nenhuma) e a biblioteca do diagrama
+            diagram.library = previous_library
+            if previous is None:
+                del self.definitions[name]
+            else:
+                self.definitions[name] = previous
+            raise
+
+    def remove(self, name: str):
+        users = self.parents(name)
+        if users:
+            raise ValueError(f"Subsistema '{name}' em uso por: {', '.join(sorted(users))}")
+        self.definitions.pop(name, None)
+
+    def content_hash(self, name: str, _stack=()):
+        """Hash canônico do subsistema: E/S, arestas, sinais e hashes dos subsistemas internos."""
+        if name in _stack:
+            raise ValueError(f"Subsistema recursivo: {' → '.join(_stack + (name,))}")
+        return self.definitions[name].canonical_hash(_stack + (name,))
+
+    def tf(self, name: str) -> ctl.TransferFunction:
+        """TF reduzida do subsistema, recalculada somente se o conteúdo mudou."""
+        if name not in self.definitions:
+            raise ValueError(f"Subsistema '{name}' não definido!")
+        key = self.content_hash(name)
+        tf = self._cache.get(key)
+        if tf is None:
+            tf = self.definitions[name].reduce()
+            self._cache[key] = tf
+        return tf
+
+    def parents(self, name: str) -> set:
+        """Subsistemas que usam 'name' direta ou indiretamente."""
+        found, pending = set(), [name]
+        while pending:
+            child = pending.pop()
+            for other, bd in self.definitions.items():
+                if other not in found and any(e.get('sub') == child for e in bd.edges):
+                    found.add(other)
+                    pending.append(other)
+        return found
+
+    def prune(self):
+        """Descarta do cache as reduções que não correspondem a nenhuma definição atual."""
+        live = {self.content_hash(n) for n in self.definitions}
+        for key in list(self._cache):
+            if key not in live:
+                del self._cache[key]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Blocos em tempo discreto (domínio z): discretização e simulação vetorizada."""
+
+import numpy as np
+import control as ctl
+from scipy import signal
+
+# Métodos de discretização aceitos para diagramas mistos (contínuo + discreto)
+C2D_METHODS = ('zoh', 'tustin')
+
+
+def is_discrete(tf):
+    """True se a TF tem tempo de amostragem definido (domínio z)."""
+    dt = getattr(tf, 'dt', 0)
+    return dt is not None and dt is not True and dt > 0
+
+
+def c2d(tf, Ts, method='zoh'):
+    """Converte uma TF contínua para o domínio z com período Ts (ZOH ou Tustin)."""
+    if method not in C2D_METHODS:
+        raise ValueError(f"Método de discretização inválido: {method}")
+    if Ts <= 0:
+        raise ValueError("O tempo de amostragem deve ser positivo.")
+    if is_discrete(tf):
+        if not np.isclose(tf.dt, Ts):
+            raise ValueError(f"Bloco discreto com Ts={tf.dt} incompatível com Ts={Ts}.")
+        return tf
+    # minreal cancela fatores espúrios como (z-1)/(z-1) do ZOH de ganhos estáticos
+    return ctl.minreal(ctl.sample_system(tf, Ts, method=method), verbose=False)
+
+
+def common_sample_time(tfs):
+    """Retorna o Ts comum aos blocos discretos (0 se todos forem contínuos)."""
+    dts = {float(tf.dt) for tf in tfs if is_discrete(tf)}
+    if not dts:
+        return 0
+    if len(dts) > 1:
+        raise ValueError(f"Blocos com tempos de amostragem diferentes: {sorted(dts)}")
+    return dts.pop()
+
+
+def harmonize(tfs, method='zoh'):
+    """Discretiza os blocos contínuos de um diagrama misto no Ts dos blocos discretos."""
+    Ts = common_sample_time(tfs)
+    if not Ts:
+        return list(tfs)
+    return [c2d(tf, Ts, method) for tf in tfs]
+
+
+def _filter_coefficients(tf):
+    """Coeficientes (b, a) da equação a diferenças em z⁻¹, com a[0] = 1."""
+    num = np.atleast_1d(np.asarray(tf.num[0][0], dtype=float))
+    den = np.atleast_1d(np.asarray(tf.den[0][0], dtype=float))
+    if len(num) > len(den):
+        raise ValueError("TF discreta não causal (grau do numerador maior que o do denominador).")
+    # Potências decrescentes de z → alinha o numerador com o denominador (atrasos à esquerda)
+    b = np.concatenate([np.zeros(len(den) - len(num)), num])
+    return b / den[0], den / den[0]
+
+
+class DiscreteSimulator:
+    """Simula uma TF em z como filtro IIR (scipy.signal.lfilter) sobre sequências longas.
+
+    O estado do filtro é mantido entre chamadas, de modo que uma sequência
+    muito longa pode ser processada em blocos sem perder continuidade.
+    """
+    def __init__(self, tf):
+        if not is_discrete(tf):
+            raise ValueError("DiscreteSimulator requer uma TF discreta (com Ts).")
+        self.dt = float(tf.dt)
+        self.b, self.a = _filter_coefficients(tf)
+        self.reset()
+
+    def reset(self):
+        """Zera o estado interno do filtro (condições iniciais nulas)."""
+        self.zi = np.zeros(max(len(self.a), len(self.b)) - 1)
+
+    def run(self, u):
+        """Aplica o filtro à sequência de entrada u e retorna a saída y."""
+        u = np.asarray(u, dtype=float)
+        if not len(self.zi):
+            return self.b[0] * u
+        y, self.zi = signal.lfilter(self.b, self.a, u, zi=self.zi)
+        return y
+
+    def step(self, n):
+        """Resposta ao degrau unitário com n amostras: retorna (t, y)."""
+        self.reset()
+        y = self.run(np.ones(int(n)))
+        return np.arange(int(n)) * self.dt, y
+
+
+def default_horizon(tf, max_samples=10000):
+    """Número de amostras suficiente para a resposta ao degrau assentar."""
+    poles = np.abs(np.roots(tf.den[0][0]))
+    poles = poles[(poles > 0) & (poles < 1)]
+    if len(poles) == 0:
+        return 100
+    slowest = poles.max()
+    # Tempo para o modo mais lento decair a ~0,2 % (≈ 6 constantes de tempo)
+    n = int(np.ceil(6.0 / max(-np.log(slowest), 1e-12)))
+    return int(min(max(n, 50), max_samples))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Executor de tarefas em segundo plano para que o mainloop do Tk nunca bloqueie."""
+
+import queue
+import threading
+
+
+class TaskCancelled(Exception):
+    """Levantada dentro de uma tarefa quando o usuário a cancela."""
+
+
+class TaskToken:
+    """Passado como primeiro argumento às tarefas: progresso e cancelamento cooperativo."""
+    def __init__(self, key, events):
+        self.key = key
+        self._events = events
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Interrompe a tarefa (TaskCancelled) se ela foi cancelada."""
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def progress(self, fraction, message=""):
+        """Publica o progresso (0 a 1); entregue à interface na thread principal."""
+        self.check()
+        self._events.put(('progress', self.key, self, (fraction, message)))
+
+    def partial(self, value):
+        """Publica um resultado parcial (ex.: melhor solução até agora) para on_partial."""
+        self.check()
+        self._events.put(('partial', self.key, self, value))
+
+
+class TaskExecutor:
+    """Roda cálculos num pool de threads e devolve os resultados via root.after.
+
+    Tarefas são identificadas por uma chave ('calc', 'bode', ...). Um novo
+    pedido com a mesma chave e a mesma assinatura (entradas) de uma tarefa em
+    andamento é ignorado; com assinatura diferente, a tarefa atual é cancelada
+    e apenas o pedido mais recente fica na fila. Os callbacks on_done/on_error
+    (e on_partial, para resultados parciais) e on_progress sempre rodam na
+    thread do Tk.
+
+    O cancelamento só vale no próximo token.progress()/check(); trechos sem
+    esses pontos (redução simbólica, fatoração LU, gravação do PDF) vão até o
+    fim. Por isso as threads de trabalho são daemon: ao fechar a janela,
+    o processo termina sem esperar por elas.
+    """
+    def __init__(self, root, max_workers=2, poll_ms=30, on_progress=None, on_idle=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_progress = on_progress  # on_progress(chave, fração, mensagem)
+        self.on_idle = on_idle          # chamado quando não resta nenhuma tarefa
+        self.max_workers = max_workers
+        self._jobs = queue.Queue()
+        self._workers = []
+        self._events = queue.Queue()
+        self._running = {}  # chave -> (token, callbacks, assinatura)
+        self._pending = {}  # chave -> (fn, args, kwargs, callbacks, assinatura)
+        self._polling = False
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, on_partial=None,
+               signature=None, **kwargs):
+        """Agenda fn(token, *args, **kwargs); on_done(resultado) roda na thread principal."""
+        callbacks = (on_done, on_error, on_partial)
+        if key in self._running:
+            token, _, running_sig = self._running[key]
+            if signature is not None and signature == running_sig and not token.cancelled:
+                self._pending.pop(key, None)
+                return  # Clique repetido: a tarefa em andamento já atende
+            # Entradas mudaram: mantém só o pedido mais recente
+            self._pending[key] = (fn, args, kwargs, callbacks, signature)
+            token.cancel()
+            return
+        self._start(key, fn, args, kwargs, callbacks, signature)
+
+    def cancel(self, key=None):
+        """Cancela a tarefa 'key' (ou todas) e descarta os pedidos pendentes."""
+        keys = [key] if key is not None else list(self._running)
+        for k in keys:
+            self._pending.pop(k, None)
+            if k in self._running:
+                self._running[k][0].cancel()
+
+    def shutdown(self):
+        """Cancela tudo e libera as threads (as que estão em cálculo são abandonadas)."""
+        self.cancel()
+        for _ in self._workers:
+            self._jobs.put(None)
+        self._workers = []
+
+    def _start(self, key, fn, args, kwargs, callbacks, signature=None):
+        token = TaskToken(key, self._events)
+        self._running[key] = (token, callbacks, signature)
+        self._jobs.put((token, fn, args, kwargs))
+        if len(self._workers) < min(self.max_workers, len(self._running)):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        if self.on_progress:
+            self.on_progress(key, 0.0, "")
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _work(self):
+        # Thread daemon: não segura o interpretador na saída
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            self._run(*job)
+
+    def _run(self, token, fn, args, kwargs):
+        # Roda na thread de trabalho: nada de Tk aqui
+        try:
+            result = fn(token, *args, **kwargs)
+            self._events.put(('done', token.key, token, result))
+        except TaskCancelled:
+            self._events.put(('cancelled', token.key, token, None))
+        except Exception as e:
+            self._events.put(('error', token.key, token, e))
+
+    def _poll(self):
+        # Roda na thread do Tk
+        while True:
+            try:
+                kind, key, token, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            current = self._running.get(key)
+            if current is None or current[0] is not token:
+                continue  # Evento de uma tarefa já substituída
+            if kind == 'progress':
+                if self.on_progress and not token.cancelled:
+                    self.on_progress(key, *payload)
+                continue
+            if kind == 'partial':
+                if current[1][2] and not token.cancelled:
+                    current[1][2](payload)
+                continue
+
+            del self._running[key]
+            on_done, on_error, _ = current[1]
+            if key in self._pending:
+                self._start(key, *self._pending.pop(key))
+            elif kind == 'done' and not token.cancelled and on_done:
+                on_done(payload)
+            elif kind == 'error' and on_error:
+                on_error(payload)
+
+        if self._running:
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+            if self.on_idle:
+                self.on_idle()
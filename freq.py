@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Cache compartilhado de resposta em frequência (Bode, Nyquist, Nichols e margens)."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Grade padrão usada pela aba "Análise": (ω mínimo, ω máximo, número de pontos)
+DEFAULT_GRID = (0.1, 1000.0, 1000)
+
+
+def tf_hash(tf, grid=None):
+    """Gera uma chave estável a partir dos coeficientes da TF e da grade de frequência."""
+    h = hashlib.sha1()
+    if hasattr(tf, 'key'):
+        # Sistemas avaliados diretamente (ex.: delay.ExactChannel) trazem a própria chave
+        h.update(tf.key.encode())
+    else:
+        for rows in (tf.num, tf.den):
+            for row in rows:
+                for poly in row:
+                    h.update(np.asarray(poly, dtype=float).tobytes())
+                    h.update(b'|')
+    h.update(repr(getattr(tf, 'dt', 0)).encode())
+    if grid is not None:
+        h.update(repr(tuple(grid)).encode())
+    return h.hexdigest()
+
+
+def grid_for(tf, grid=DEFAULT_GRID):
+    """Ajusta a grade para sistemas discretos, limitando ω à frequência de Nyquist π/Ts."""
+    dt = getattr(tf, 'dt', 0)
+    wmin, wmax, n = grid
+    if dt and dt is not True:
+        wmax = min(wmax, np.pi / dt)
+        wmin = min(wmin, wmax / 100)
+    return (wmin, wmax, n)
+
+
+def evaluate(tf, omega):
+    """Avalia G(jω) de uma TF SISO sobre o vetor omega."""
+    if hasattr(tf, 'evaluate'):
+        return tf.evaluate(omega)
+    num, den = tf.num[0][0], tf.den[0][0]
+    dt = getattr(tf, 'dt', 0)
+    if dt:
+        x = np.exp(1j * omega * dt)
+    else:
+        x = 1j * omega
+    return np.polyval(num, x) / np.polyval(den, x)
+
+
+class FrequencyData:
+    """Resposta em frequência de um sistema numa grade, com grandezas derivadas."""
+    def __init__(self, omega, response):
+        self.omega = omega
+        self.response = response
+        self.mag = np.abs(response)
+        self.mag_db = 20 * np.log10(np.maximum(self.mag, 1e-300))
+        self.phase_deg = np.degrees(np.unwrap(np.angle(response)))
+        self._margins = None
+
+    @property
+    def nbytes(self):
+        return (self.omega.nbytes + self.response.nbytes + self.mag.nbytes
+                + self.mag_db.nbytes + self.phase_deg.nbytes)
+
+    def margins(self):
+        """Calcula (uma única vez) as margens de ganho e de fase a partir da grade."""
+        if self._margins is None:
+            self._margins = stability_margins(self)
+        return self._margins
+
+
+def _crossings(x, y, level):
+    """Retorna os valores de x (interpolados) em que y cruza 'level'."""
+    d = y - level
+    idx = np.nonzero(np.sign(d[:-1]) * np.sign(d[1:]) < 0)[0]
+    out = []
+    for i in idx:
+        t = d[i] / (d[i] - d[i+1])
+        out.append((i, t, x[i] + t * (x[i+1] - x[i])))
+    return out
+
+
+def stability_margins(data):
+    """Margens de ganho (dB) e de fase (graus) com as respectivas frequências de cruzamento.
+
+    Retorna um dicionário com 'gm_db', 'w_pc', 'pm_deg' e 'w_gc'; as entradas
+    ficam como None quando não há cruzamento dentro da grade.
+    """
+    logw = np.log10(data.omega)
+    result = {'gm_db': None, 'w_pc': None, 'pm_deg': None, 'w_gc': None}
+
+    # Cruzamento de fase: fase = -180 + k·360
+    best = None
+    lo = np.floor((data.phase_deg.min() + 180) / 360)
+    hi = np.ceil((data.phase_deg.max() + 180) / 360)
+    for k in np.arange(lo, hi + 1):
+        for i, t, lw in _crossings(logw, data.phase_deg, -180 + 360 * k):
+            mag_db = data.mag_db[i] + t * (data.mag_db[i+1] - data.mag_db[i])
+            if best is None or -mag_db < best[0]:
+                best = (float(-mag_db), float(10 ** lw))
+    if best is not None:
+        result['gm_db'], result['w_pc'] = best
+
+    # Cruzamento de ganho: |G| = 0 dB
+    best = None
+    for i, t, lw in _crossings(logw, data.mag_db, 0.0):
+        ph = data.phase_deg[i] + t * (data.phase_deg[i+1] - data.phase_deg[i])
+        pm = (ph + 180) % 360
+        if pm > 180:
+            pm -= 360
+        if best is None or pm < best[0]:
+            best = (float(pm), float(10 ** lw))
+    if best is not None:
+        result['pm_deg'], result['w_gc'] = best
+
+    return result
+
+
+class FrequencyCache:
+    """Cache LRU de respostas em frequência, limitado por orçamento de memória (bytes).
+
+    Se 'store' (PersistentCache) for informado, as respostas também são
+    gravadas em disco e reaproveitadas entre sessões.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024, store=None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self._data = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # O cache é consultado pelas threads de trabalho
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, tf, grid=DEFAULT_GRID):
+        """Retorna o FrequencyData de 'tf' na grade, calculando apenas se necessário."""
+        key = tf_hash(tf, grid)
+        with self._lock:
+            data = self._data.get(key)
+            if data is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        stored = self.store.get(key, 'freq') if self.store is not None else None
+        if stored is not None:
+            data = FrequencyData(*stored)
+        else:
+            wmin, wmax, n = grid
+            omega = np.logspace(np.log10(wmin), np.log10(wmax), int(n))
+            data = FrequencyData(omega, evaluate(tf, omega))
+            if self.store is not None:
+                self.store.put(key, 'freq', (data.omega, data.response))
+        with self._lock:
+            if key not in self._data:
+                self._data[key] = data
+                self._bytes += data.nbytes
+                self._evict()
+        return data
+
+    def _evict(self):
+        # Mantém sempre a entrada mais recente, mesmo que sozinha exceda o orçamento
+        while self._bytes > self.max_bytes and len(self._data) > 1:
+            _, old = self._data.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
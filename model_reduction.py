@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Redução de ordem de modelos por truncamento balanceado (com limite de erro em norma H∞)."""
+
+import numpy as np
+import control as ctl
+from scipy import linalg
+
+from discrete import is_discrete
+
+
+def _split_stable(A, B, C, discrete):
+    """Separa a parte estável da instável (Schur ordenada + Sylvester): G = Gs + Gi."""
+    sort = 'iuc' if discrete else 'lhp'
+    T, Z, k = linalg.schur(A, output='real', sort=sort)
+    B, C = Z.T @ B, C @ Z
+    if k in (0, A.shape[0]):
+        return (T, B, C), k
+    # Desacopla os blocos: T11·X − X·T22 = −T12
+    X = linalg.solve_sylvester(T[:k, :k], -T[k:, k:], -T[:k, k:])
+    B1 = B[:k] - X @ B[k:]
+    C2 = C[:, :k] @ X + C[:, k:]
+    return (T[:k, :k], B1, C[:, :k], T[k:, k:], B[k:], C2), k
+
+
+def _factor(M):
+    """Fator L com M ≈ L·Lᵀ para gramianos semidefinidos (autovalores negativos zerados)."""
+    w, U = linalg.eigh((M + M.T) / 2)
+    return U * np.sqrt(np.maximum(w, 0.0))
+
+
+def hankel_singular_values(A, B, C, discrete=False):
+    """Valores singulares de Hankel e fatores dos gramianos de um sistema estável."""
+    if discrete:
+        P = linalg.solve_discrete_lyapunov(A, B @ B.T, method='bilinear')
+        Q = linalg.solve_discrete_lyapunov(A.T, C.T @ C, method='bilinear')
+    else:
+        P = linalg.solve_continuous_lyapunov(A, -B @ B.T)
+        Q = linalg.solve_continuous_lyapunov(A.T, -C.T @ C)
+    Lp, Lq = _factor(P), _factor(Q)
+    W, hsv, Vt = linalg.svd(Lq.T @ Lp)
+    return hsv, Lp, Lq, W, Vt.T
+
+
+def balanced_truncation(tf, order=None, tol=None):
+    """Reduz tf por truncamento balanceado (raiz quadrada); retorna (tf_r, limite, hsv).
+
+    Escolhe a ordem pedida ou a menor ordem cujo limite de erro
+    ‖G − Gr‖∞ ≤ 2·Σ σᵢ (valores de Hankel descartados) não excede tol.
+    Os polos instáveis não são reduzidos: a parte instável é mantida exata.
+    """
+    discrete = is_discrete(tf)
+    dt = tf.dt if discrete else 0
+    sys = ctl.tf2ss(tf)
+    A, B = np.asarray(sys.A, dtype=float), np.asarray(sys.B, dtype=float)
+    C, D = np.asarray(sys.C, dtype=float), np.asarray(sys.D, dtype=float)
+    n = A.shape[0]
+    if n == 0:
+        return tf, 0.0, np.zeros(0)
+    # A forma companheira de tf2ss é mal escalada: equilibra antes dos gramianos
+    _, (scale, _) = linalg.matrix_balance(A, permute=False, separate=True)
+    A, B, C = A * scale[None, :] / scale[:, None], B / scale[:, None], C * scale[None, :]
+
+    parts, k = _split_stable(A, B, C, discrete)
+    As, Bs, Cs = parts[:3]
+    if k == 0:
+        raise ValueError("Sistema sem parte estável: nada a reduzir.")
+    hsv, Lp, Lq, W, V = hankel_singular_values(As, Bs, Cs, discrete)
+
+    n_unstable = n - k
+    tail = 2.0 * np.concatenate([np.cumsum(hsv[::-1])[::-1], [0.0]])  # tail[r] = 2·Σ_{i≥r} σᵢ
+    if order is not None:
+        r = int(order) - n_unstable
+        if r < 0:
+            raise ValueError(f"Ordem mínima {n_unstable} (número de polos instáveis).")
+        r = min(r, k)
+    elif tol is not None:
+        r = int(np.argmax(tail <= tol))
+    else:
+        raise ValueError("Informe a ordem ou o erro máximo.")
+    # Não divide por valores singulares nulos (estados não controláveis/observáveis)
+    r = min(r, int(np.sum(hsv > hsv[0] * 1e-14)) if hsv[0] > 0 else 0)
+
+    s = np.sqrt(hsv[:r])
+    Tr = Lp @ V[:, :r] / s
+    Tl = Lq @ W[:, :r] / s
+    Ar, Br, Cr = Tl.T @ As @ Tr, Tl.T @ Bs, Cs @ Tr
+    if n_unstable:
+        Au, Bu, Cu = parts[3:]
+        Ar = linalg.block_diag(Ar, Au)
+        Br = np.vstack([Br, Bu])
+        Cr = np.hstack([Cr, Cu])
+
+    if Ar.shape[0]:
+        reduced = ctl.ss2tf(ctl.ss(Ar, Br, Cr, D, dt) if dt else ctl.ss(Ar, Br, Cr, D))
+    else:
+        reduced = ctl.TransferFunction(D.ravel(), [1.0], dt) if dt else ctl.TransferFunction(D.ravel(), [1.0])
+    return reduced, float(tail[r]), hsv
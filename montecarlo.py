@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Análise de Monte Carlo: incerteza nos coeficientes e parâmetros, avaliada em lote."""
+
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import sympy as sp
+
+from symbolic import CompiledTransfer
+
+# Percentis exibidos nas faixas da resposta ao degrau
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+
+_COEFFICIENT = re.compile(r'^\s*(.+?)\s*(?:→|->)\s*(.+?)\s*\.\s*(num|den)\s*\[\s*(\d+)\s*\]\s*$')
+
+
+def parse_distribution(text, nominal=None):
+    """Converte 'N(μ, σ)', 'U(a, b)', '±p%' ou '±x' (em torno do nominal) numa especificação."""
+    txt = text.strip().replace(' ', '')
+    m = re.fullmatch(r'([NU])\(([^,]+),([^)]+)\)', txt, flags=re.IGNORECASE)
+    if m:
+        a, b = float(m.group(2)), float(m.group(3))
+        if m.group(1).upper() == 'N':
+            if b < 0:
+                raise ValueError(f"Desvio padrão negativo: {text}")
+            return ('normal', a, b)
+        return ('uniform', min(a, b), max(a, b))
+    m = re.fullmatch(r'(?:±|\+-|\+/-)([0-9.eE+-]+)(%?)', txt)
+    if m:
+        if nominal is None:
+            raise ValueError(f"Tolerância sem valor nominal: {text}")
+        tol = float(m.group(1)) * (abs(nominal) / 100.0 if m.group(2) else 1.0)
+        return ('uniform', nominal - tol, nominal + tol)
+    raise ValueError(f"Distribuição inválida: {text} (use N(μ,σ), U(a,b) ou ±p%)")
+
+
+def sample(spec, n, rng):
+    """Sorteia n valores da distribuição 'spec'."""
+    kind, a, b = spec
+    if kind == 'normal':
+        return rng.normal(a, b, n)
+    return rng.uniform(a, b, n)
+
+
+def parse_uncertainty(text):
+    """Lê 'K=N(2,0.1); a→b.den[1]=±5%' como {alvo: texto da distribuição}.
+
+    O alvo é o nome de um parâmetro ou um coeficiente 'origem→destino.num[i]'
+    (ou den[i]), com índices em potências decrescentes de s.
+    """
+    targets = {}
+    for item in text.split(';'):
+        if not item.strip():
+            continue
+        target, sep, dist = item.rpartition('=')
+        if not sep or not target.strip():
+            raise ValueError(f"Incerteza inválida: {item.strip()} (use alvo=distribuição)")
+        m = _COEFFICIENT.match(target)
+        key = (m.group(1), m.group(2), m.group(3), int(m.group(4))) if m else target.strip()
+        targets[key] = dist
+    return targets
+
+
+def symbolize_coefficients(bd, targets):
+    """Cópia do diagrama em que os coeficientes incertos viram símbolos.
+
+    Retorna (diagrama, {símbolo: valor nominal}, {alvo: símbolo}); alvos
+    que são nomes de parâmetros são mantidos como estão.
+    """
+    bd = bd.copy()
+    nominal = {}
+    names = {}
+    for target in targets:
+        if isinstance(target, str):
+            continue
+        u, v, part, i = target
+        edge = next((e for e in bd.edges if e['u'] == u and e['v'] == v), None)
+        if edge is None:
+            raise ValueError(f"Bloco {u}→{v} não existe!")
+        if edge.get('expr') is not None:
+            num, den = (list(p) for p in edge['expr'])
+        elif edge.get('sub') is None and edge.get('delay') is None and edge.get('nl') is None \
+                and not getattr(edge['tf'], 'dt', 0):
+            num = [float(c) for c in edge['tf'].num[0][0]]
+            den = [float(c) for c in edge['tf'].den[0][0]]
+        else:
+            raise ValueError(f"Incerteza de coeficiente só em blocos contínuos simples: {u}→{v}")
+        coeffs = num if part == 'num' else den
+        if i >= len(coeffs):
+            raise ValueError(f"{u}→{v}.{part}[{i}] não existe (o bloco tem {len(coeffs)} coeficientes).")
+        if isinstance(coeffs[i], sp.Basic) and not coeffs[i].is_number:
+            raise ValueError(f"{u}→{v}.{part}[{i}] já é simbólico: use o nome do parâmetro.")
+        name = re.sub(r'\W', '_', f"c_{u}_{v}_{part}{i}")
+        nominal[name] = float(coeffs[i])
+        coeffs[i] = sp.Symbol(name)
+        edge.clear()
+        edge.update({'u': u, 'v': v, 'tf': None, 'expr': (tuple(num), tuple(den))})
+        names[target] = name
+    return bd, nominal, names
+
+
+def batch_margins(omega, H):
+    """Margens de ganho e de fase de cada linha de H (N, len(omega)), vetorizadas.
+
+    Mesmo critério de freq.stability_margins (a pior margem entre os
+    cruzamentos); sem cruzamento na grade, o valor é NaN.
+    """
+    logw = np.log10(omega)
+    mag_db = 20 * np.log10(np.maximum(np.abs(H), 1e-300))
+    phase = np.degrees(np.unwrap(np.angle(H), axis=1))
+    rows = np.arange(H.shape[0])
+    dlw = np.diff(logw)[None, :]
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        # Cruzamento de ganho (|G| = 0 dB)
+        d0, d1 = mag_db[:, :-1], mag_db[:, 1:]
+        cross = np.sign(d0) * np.sign(d1) < 0
+        t = d0 / (d0 - d1)
+        ph = phase[:, :-1] + t * np.diff(phase, axis=1)
+        pm = (ph + 180) % 360
+        pm = np.where(pm > 180, pm - 360, pm)
+        pm = np.where(cross, pm, np.inf)
+        j = pm.argmin(axis=1)
+        found = cross.any(axis=1)
+        pm_deg = np.where(found, pm[rows, j], np.nan)
+        w_gc = np.where(found, 10 ** (logw[:-1][j] + t[rows, j] * dlw[0, j]), np.nan)
+
+        # Cruzamento de fase (-180° + k·360°)
+        q = np.floor((phase + 180) / 360)
+        cross = q[:, :-1] != q[:, 1:]
+        level = -180 + 360 * np.maximum(q[:, :-1], q[:, 1:])
+        t = (level - phase[:, :-1]) / np.diff(phase, axis=1)
+        gm = -(mag_db[:, :-1] + t * np.diff(mag_db, axis=1))
+        gm = np.where(cross, gm, np.inf)
+        j = gm.argmin(axis=1)
+        found = cross.any(axis=1)
+        gm_db = np.where(found, gm[rows, j], np.nan)
+        w_pc = np.where(found, 10 ** (logw[:-1][j] + t[rows, j] * dlw[0, j]), np.nan)
+    return {'gm_db': gm_db, 'w_pc': w_pc, 'pm_deg': pm_deg, 'w_gc': w_gc}
+
+
+def loop_margins(loops, omega, values, n):
+    """Pior margem de ganho e de fase entre os laços abertos (sem cruzamento = infinita).
+
+    loops: [(expr, params)] das transferências de malha L(s); values como em
+    CompiledTransfer, com n amostras.
+    """
+    gm, pm = np.full(n, np.inf), np.full(n, np.inf)
+    for loop in loops:
+        m = batch_margins(omega, compiled_transfer(*loop).freqresp(omega, **values))
+        gm = np.fmin(gm, np.where(np.isnan(m['gm_db']), np.inf, m['gm_db']))
+        pm = np.fmin(pm, np.where(np.isnan(m['pm_deg']), np.inf, m['pm_deg']))
+    return {'gm_db': gm, 'pm_deg': pm}
+
+
+_COMPILED = {}  # Compilação reaproveitada entre lotes no mesmo processo
+
+
+def compiled_transfer(expr, params):
+    """CompiledTransfer de expr, compilado uma única vez por processo."""
+    key = sp.srepr(expr)
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        compiled = _COMPILED[key] = CompiledTransfer(expr, params)
+        _COMPILED.setdefault(sp.srepr(compiled.expr), compiled)
+    return compiled
+
+
+def process_pool(workers):
+    """Pool de processos (forkserver quando disponível); None para avaliar no próprio processo."""
+    if not workers or workers <= 1:
+        return None
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _evaluate_chunk(expr, params, loops, values, omega, t):
+    """Polos, margens e degraus de um lote de amostras (roda também nos processos de trabalho).
+
+    Polos e degraus são do canal em malha fechada; as margens, dos laços em 'loops'.
+    """
+    compiled = compiled_transfer(expr, params)
+    poles = compiled.poles(**values)
+    margins = loop_margins(loops, omega, values, poles.shape[0])
+    return poles, margins, compiled.step(t, **values)
+
+
+class MonteCarloResult:
+    """Resultado da análise: polos, margens e faixas de percentis da resposta ao degrau."""
+    def __init__(self, samples, poles, margins, t, steps):
+        self.samples = samples  # {parâmetro: array (N,)}
+        self.poles = poles
+        self.n = poles.shape[0]
+        self.stable = np.all(poles.real < 0, axis=1)
+        self.p_unstable = 1.0 - self.stable.mean()
+        self.margins = margins
+        self.t = t
+        # Faixas calculadas só com as amostras estáveis (as instáveis divergem)
+        ok = steps[self.stable]
+        self.step_bands = ({p: np.percentile(ok, p, axis=0) for p in BAND_PERCENTILES}
+                           if len(ok) else {})
+
+    def margin_percentiles(self, q=(5, 50, 95)):
+        """Percentis das margens de malha de ganho e de fase (ignorando amostras sem cruzamento)."""
+        out = {}
+        for name in ('gm_db', 'pm_deg'):
+            x = self.margins[name][self.stable]
+            x = x[np.isfinite(x)]
+            out[name] = dict(zip(q, np.percentile(x, q))) if len(x) else None
+        return out
+
+
+def run_monte_carlo(bd, output, input, uncertainty, n=2000, t=None, omega=None,
+                    seed=None, workers=None, chunk=500, progress=None):
+    """Sorteia n amostras das incertezas e avalia o canal input→output em lote.
+
+    uncertainty: {alvo: distribuição} como em parse_uncertainty. A redução
+    simbólica é feita uma vez; as margens são as piores entre os laços abertos
+    em cada aresta de retorno do diagrama (loop_transfer). Cada lote de
+    'chunk' amostras é avaliado com álgebra polinomial vetorizada, em
+    processos separados se workers > 1.
+    progress(fração) é chamado a cada lote concluído.
+    """
+    if not uncertainty:
+        raise ValueError("Informe ao menos uma incerteza.")
+    sym_bd, coeff_nominal, names = symbolize_coefficients(bd, uncertainty)
+    compiled = sym_bd.compile(output, input)
+    nominal = dict(bd.params, **coeff_nominal)
+    loops = []
+    for (u, v) in sorted(sym_bd._loop_edges()):
+        L = sym_bd.loop_transfer(u, v)
+        if L != 0:
+            loop = compiled_transfer(L, None)
+            loops.append((loop.expr, loop.params))
+
+    rng = np.random.default_rng(seed)
+    values = {}
+    for target, dist in uncertainty.items():
+        name = names.get(target, target)
+        if name not in compiled.names:
+            raise ValueError(f"'{name}' não aparece no canal {input}→{output}.")
+        spec = dist if isinstance(dist, tuple) else parse_distribution(dist, nominal.get(name))
+        values[name] = sample(spec, n, rng)
+    for name in set(compiled.names).union(*[[p.name for p in params] for _, params in loops]):
+        if name not in values:
+            if name not in nominal:
+                raise ValueError(f"Defina valores para os parâmetros: {name}")
+            values[name] = np.full(n, nominal[name])
+
+    if omega is None:
+        omega = np.logspace(-1, 3, 1000)
+    if t is None:
+        p = compiled.poles(**{k: v[:1] for k, v in values.items()})[0]
+        slow = -p.real[p.real < 0]
+        t = np.linspace(0, 8.0 / slow.min() if len(slow) else 10.0, 500)
+
+    chunks = [{k: v[a:a + chunk] for k, v in values.items()} for a in range(0, n, chunk)]
+    args = (compiled.expr, compiled.params, loops)
+    results = []
+    pool = process_pool(workers)
+    if pool is not None:
+        with pool:
+            futures = [pool.submit(_evaluate_chunk, *args, c, omega, t) for c in chunks]
+            try:
+                for i, f in enumerate(futures):
+                    results.append(f.result())
+                    if progress:
+                        progress((i + 1) / len(futures))
+            except BaseException:
+                for f in futures:
+                    f.cancel()
+                raise
+    else:
+        _COMPILED[sp.srepr(compiled.expr)] = compiled
+        for i, c in enumerate(chunks):
+            results.append(_evaluate_chunk(*args, c, omega, t))
+            if progress:
+                progress((i + 1) / len(chunks))
+
+    poles = np.concatenate([r[0] for r in results])
+    margins = {k: np.concatenate([r[1][k] for r in results]) for k in results[0][1]}
+    steps = np.concatenate([r[2] for r in results])
+    return MonteCarloResult(values, poles, margins, t, steps)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Cache persistente (SQLite) de reduções, LaTeX e respostas, reaproveitado entre sessões."""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Incrementar sempre que um algoritmo que produz valores em cache mudar:
+# entradas gravadas com outra versão são descartadas ao abrir o cache.
+# 2: sinal de cada bloco aplicado no somador de destino; realimentação só em laços isolados
+ALGORITHM_VERSION = 2
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.block_diagram_studio', 'cache.sqlite')
+
+
+class PersistentCache:
+    """Armazena valores (serializados com pickle) por chave de conteúdo, com LRU por tamanho.
+
+    As chaves são hashes canônicos (do diagrama ou da TF); 'kind' separa os
+    tipos de valor ('reduction', 'freq', 'step'...). A conexão é compartilhada
+    pelas threads de trabalho sob um lock.
+    """
+    def __init__(self, path=DEFAULT_PATH, max_bytes=256 * 1024 * 1024,
+                 version=ALGORITHM_VERSION):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                    key TEXT, kind TEXT, value BLOB, size INTEGER,
+                                    accessed REAL, PRIMARY KEY (key, kind))""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            row = self._db.execute("SELECT value FROM meta WHERE name='version'").fetchone()
+            if row is None or int(row[0]) != version:
+                # Versão diferente: os valores gravados podem estar obsoletos
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(version),))
+
+    def get(self, key, kind):
+        """Retorna o valor armazenado ou None; marca a entrada como usada recentemente."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM entries WHERE key=? AND kind=?",
+                                   (key, kind)).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute("UPDATE entries SET accessed=? WHERE key=? AND kind=?",
+                                 (time.time(), key, kind))
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            self.delete(key, kind)  # Entrada corrompida ou de uma versão incompatível
+            return None
+
+    def put(self, key, kind, value):
+        """Grava o valor e despeja as entradas menos usadas se o tamanho total exceder o limite."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (key, kind, blob, len(blob), time.time()))
+            self._evict()
+
+    def delete(self, key, kind):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries WHERE key=? AND kind=?", (key, kind))
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, kind, size FROM entries ORDER BY accessed").fetchall()
+        for key, kind, size in rows[:-1]:  # Nunca despeja a entrada recém-gravada sozinha
+            self._db.execute("DELETE FROM entries WHERE key=? AND kind=?", (key, kind))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
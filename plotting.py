@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Eixos persistentes da aba Análise e redução de pontos (LTTB) para curvas longas."""
+
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: escolhe n_out pontos preservando a forma da curva."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+    # Baldes de mesmo número de amostras entre o primeiro e o último ponto
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Próximo balde representado pela média (o último, pelo ponto final)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def fit_limits(ax, x, y, margin=0.05):
+    """Ajusta os limites do eixo aos dados completos (sem relim sobre pontos reduzidos)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x, y = x[np.isfinite(x)], y[np.isfinite(y)]
+    if not len(x) or not len(y):
+        return
+    if ax.get_xscale() == 'log':
+        x = x[x > 0]
+        ax.set_xlim(x.min(), x.max())
+    else:
+        lo, hi = x.min(), x.max()
+        pad = (hi - lo) * margin or 1.0
+        ax.set_xlim(lo - pad, hi + pad)
+    lo, hi = y.min(), y.max()
+    pad = (hi - lo) * margin or 1.0
+    ax.set_ylim(lo - pad, hi + pad)
+
+
+class DecimatedLine:
+    """Line2D que guarda os dados completos e desenha ~1 ponto por pixel da janela visível.
+
+    A cada mudança de limites do eixo x (zoom/pan), a janela visível é
+    reamostrada a partir dos dados completos; x precisa ser crescente.
+    """
+    def __init__(self, line, method=lttb):
+        self.line = line
+        self.method = method
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        line.axes.callbacks.connect('xlim_changed', lambda ax: self.refresh())
+
+    def set_data(self, x, y):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.refresh(full=True)
+
+    def refresh(self, full=False):
+        x, y = self.x, self.y
+        if not full and len(x):
+            lo, hi = sorted(self.line.axes.get_xlim())
+            i0 = max(np.searchsorted(x, lo) - 1, 0)
+            i1 = min(np.searchsorted(x, hi) + 1, len(x))
+            x, y = x[i0:i1], y[i0:i1]
+        width = int(self.line.axes.get_window_extent().width) or 800
+        self.line.set_data(*self.method(x, y, width))
+
+
+class AnalysisViews:
+    """Conjuntos de eixos da aba Análise criados uma única vez e reaproveitados.
+
+    Cada visão ('bode', 'step'...) é construída por uma função que recebe a
+    figura e retorna um dicionário de artistas; trocar de visão só alterna a
+    visibilidade dos eixos e as atualizações usam set_data.
+    """
+    def __init__(self, fig, builders):
+        self.fig = fig
+        self.builders = builders
+        self.views = {}
+        self.current = None
+
+    def show(self, name):
+        """Torna a visão 'name' visível (criando-a na primeira vez) e retorna seus artistas."""
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = self.builders[name](self.fig)
+        if self.current != name:
+            for other, v in self.views.items():
+                for ax in v['axes']:
+                    ax.set_visible(other == name)
+            self.current = name
+            self.fig.tight_layout()  # Só ao trocar de visão: o layout não muda com os dados
+        return view
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Plano de redução: os passos série/paralelo/realimentação como DAG sobre os blocos originais."""
+
+from freq import tf_hash
+
+
+class ReductionPlan:
+    """DAG dos passos de uma redução, reaproveitado quando só os coeficientes mudam.
+
+    Os nós 0..E-1 são os blocos originais (na ordem de bd.edges); cada passo
+    cria um novo nó combinando dois nós anteriores, de modo que os ids já
+    estão em ordem topológica. Cada nó guarda o ramo resultante como
+    {'tf': TF, 'delay': atraso pendente}. 'structure' identifica a topologia
+    (arestas, sinais, atrasos, E/S) para a qual o plano vale.
+    """
+    def __init__(self, structure, leaves):
+        self.structure = structure
+        self.steps = []  # (operação, nó a, nó b, argumento) de cada nó combinado
+        self.values = list(leaves)
+        self.hashes = [tf_hash(leaf['tf']) for leaf in leaves]
+        self.result = None  # Nó final (None se a redução precisou resolver o grafo)
+        self.recomputed = len(leaves)  # Nós recalculados na última atualização
+
+    @property
+    def n_leaves(self):
+        return len(self.hashes)
+
+    def add(self, op, a, b, arg, merge):
+        """Registra o passo op(a, b) e retorna o id do novo nó."""
+        self.values.append(merge(op, self.values[a], self.values[b], arg))
+        self.steps.append((op, a, b, arg))
+        self.recomputed += 1
+        return len(self.values) - 1
+
+    def origins(self, node):
+        """Índices dos blocos originais que compõem o nó."""
+        out, stack = set(), [node]
+        while stack:
+            i = stack.pop()
+            if i < self.n_leaves:
+                out.add(i)
+            else:
+                _, a, b, _ = self.steps[i - self.n_leaves]
+                stack.extend((a, b))
+        return out
+
+    def update(self, leaves, merge):
+        """Novo plano com os blocos alterados e apenas os passos a jusante deles recalculados."""
+        E = self.n_leaves
+        hashes = list(self.hashes)
+        dirty = set()
+        for i, leaf in enumerate(leaves):
+            # A mesma TF (mesmo objeto) não precisa ser hasheada de novo
+            if leaf['tf'] is self.values[i]['tf'] and leaf.get('delay') == self.values[i].get('delay'):
+                continue
+            h = tf_hash(leaf['tf'])
+            if h != hashes[i]:
+                hashes[i] = h
+                dirty.add(i)
+        plan = ReductionPlan.__new__(ReductionPlan)
+        plan.structure, plan.steps, plan.result = self.structure, self.steps, self.result
+        plan.hashes = hashes
+        plan.values = list(self.values)
+        for i in range(E):
+            # Mantém os objetos novos mesmo quando iguais, para o teste de identidade acima
+            plan.values[i] = leaves[i]
+        for j, (op, a, b, arg) in enumerate(self.steps):
+            if a in dirty or b in dirty:
+                plan.values[E + j] = merge(op, plan.values[a], plan.values[b], arg)
+                dirty.add(E + j)
+        plan.recomputed = len(dirty)
+        return plan
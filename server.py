@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Servidor local JSON-RPC 2.0 para redução e análise de diagramas de blocos.
+
+Uso:
+    python server.py                      # HTTP em 127.0.0.1:8765 (POST /)
+    python server.py --port 9000
+    python server.py --unix /tmp/bds.sock # socket Unix, uma mensagem JSON por linha
+
+Cada requisição é um objeto JSON-RPC 2.0 ou uma lista deles (lote). Todos os
+métodos recebem em "params" um diagrama no formato:
+
+    {
+      "diagram": {
+        "inputs":  ["input"],            # opcional, padrão ["input"]
+        "outputs": ["output"],           # opcional, padrão ["output"]
+        "blocks": [
+          {"from": "input",  "to": "output", "num": [1], "den": [1, 1]},
+          {"from": "output", "to": "input",  "num": [1], "den": [1],
+           "sign": "-"},                 # sinal do bloco no somador de destino (padrão "+")
+          {"from": "u", "to": "y", "num": [0.5], "den": [1, -0.5],
+           "dt": 0.1},                   # bloco discreto (em z), opcional
+          {"from": "y", "to": "w", "delay": 0.2}   # atraso de transporte e^{-sT}
+        ],
+        "c2d_method": "zoh",             # opcional: "zoh" ou "tustin"
+        "pade_order": 3                  # opcional: ordem do Padé dos atrasos (reduce/matrix)
+      },
+      "input": "input", "output": "output"   # canal (opcional, padrão: o primeiro)
+    }
+
+Métodos:
+    reduce   -> {"num", "den", "dt", "latex"} do canal
+    matrix   -> [{"input", "output", "num", "den", "dt"}, ...] (todos os canais)
+    bode     -> {"omega", "mag_db", "phase_deg", "margins"}; aceita "grid": [ωmin, ωmax, n]
+    margins  -> {"gm_db", "w_pc", "pm_deg", "w_gc"} do pior laço do diagrama (null sem laços)
+    step     -> {"t", "y"}; aceita "t_final" e "n_points"
+
+Com atrasos, bode/margins usam e^{-jωT} exato e step simula o diagrama com
+linha de atraso; reduce/matrix retornam a aproximação de Padé.
+
+O trabalho numérico roda num pool de processos fixo (sem um interpretador
+novo por requisição), e resultados de diagramas repetidos vêm de um cache LRU;
+requisições idênticas simultâneas compartilham o mesmo cálculo.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class RPCError(Exception):
+    """Erro com código JSON-RPC."""
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def canonical_key(method, params):
+    """Chave do cache: hash do método e dos parâmetros serializados de forma canônica."""
+    text = json.dumps([method, params], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+# Funções executadas nos processos de trabalho (precisam ser importáveis no nível do módulo)
+
+def build_diagram(spec):
+    """Constrói um BlockDiagram a partir do dicionário JSON documentado acima."""
+    import control as ctl
+    from diagram import BlockDiagram
+
+    if not isinstance(spec, dict) or not isinstance(spec.get('blocks'), list):
+        raise RPCError(INVALID_PARAMS, "params.diagram.blocks deve ser uma lista")
+    bd = BlockDiagram(spec.get('inputs', ['input']), spec.get('outputs', ['output']))
+    bd.c2d_method = spec.get('c2d_method', 'zoh')
+    bd.pade_order = int(spec.get('pade_order', 3))
+    for b in spec['blocks']:
+        if 'delay' in b:
+            try:
+                bd.add_delay_block(str(b['from']), str(b['to']), float(b['delay']), b.get('sign', '+'))
+            except (KeyError, TypeError, ValueError) as e:
+                raise RPCError(INVALID_PARAMS, f"Bloco inválido {b!r}: {e}")
+            continue
+        try:
+            num = [float(c) for c in b['num']]
+            den = [float(c) for c in b['den']]
+            u, v = str(b['from']), str(b['to'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise RPCError(INVALID_PARAMS, f"Bloco inválido {b!r}: {e}")
+        dt = b.get('dt')
+        tf = ctl.TransferFunction(num, den, dt) if dt else ctl.TransferFunction(num, den)
+        bd.add_block(u, v, tf, b.get('sign', '+'))
+    return bd
+
+
+def _tf_json(tf):
+    return {'num': [float(c) for c in tf.num[0][0]],
+            'den': [float(c) for c in tf.den[0][0]],
+            'dt': float(tf.dt) if tf.dt else 0}
+
+
+def _channel_tf(bd, params):
+    u = params.get('input', bd.inputs[0])
+    y = params.get('output', bd.outputs[0])
+    if u not in bd.inputs or y not in bd.outputs:
+        raise RPCError(INVALID_PARAMS, f"Canal {u}→{y} não declarado")
+    if len(bd.inputs) == 1 and len(bd.outputs) == 1:
+        return bd.reduce()
+    return bd.transfer_matrix()[(y, u)]
+
+
+def _finite(values):
+    # JSON não representa NaN/inf
+    return [float(v) if np.isfinite(v) else None for v in values]
+
+
+def run_method(method, params):
+    """Executa um método de análise (no processo de trabalho) e retorna um resultado JSON."""
+    from diagram import _tf_latex
+    from freq import DEFAULT_GRID, FrequencyCache, grid_for
+
+    bd = build_diagram(params.get('diagram'))
+    if method == 'matrix':
+        return [dict(_tf_json(tf), input=u, output=y)
+                for (y, u), tf in bd.transfer_matrix().items()]
+
+    tf = _channel_tf(bd, params)
+    if method == 'reduce':
+        return dict(_tf_json(tf), latex=_tf_latex(tf))
+    if bd.has_delays() and method in ('bode', 'margins', 'step'):
+        from delay import ExactChannel
+        channel = ExactChannel(bd, params.get('output', bd.outputs[0]),
+                               params.get('input', bd.inputs[0]))
+        if method == 'step':
+            sim = bd.simulator()
+            t_final = float(params.get('t_final', 20.0))
+            t, y = sim.run(t_final, {channel.input: 1.0})
+            y = y[channel.output]
+            n = int(params.get('n_points', 1000))
+            idx = np.unique(np.linspace(0, len(t) - 1, n).astype(int))
+            return {'t': _finite(t[idx]), 'y': _finite(y[idx])}
+        tf = channel
+    if method in ('bode', 'margins'):
+        grid = tuple(params.get('grid', DEFAULT_GRID))
+        data = FrequencyCache().get(tf, grid_for(tf, grid))
+        # Margens de malha: pior laço do diagrama, não o canal em malha fechada
+        margins = bd.loop_margins(data.omega)
+        if method == 'margins':
+            return margins
+        return {'omega': _finite(data.omega), 'mag_db': _finite(data.mag_db),
+                'phase_deg': _finite(data.phase_deg), 'margins': margins}
+    if method == 'step':
+        from discrete import DiscreteSimulator, default_horizon, is_discrete
+        import control as ctl
+        if is_discrete(tf):
+            t, y = DiscreteSimulator(tf).step(params.get('n_points', default_horizon(tf)))
+        else:
+            kwargs = {}
+            if 't_final' in params:
+                kwargs['T'] = np.linspace(0, float(params['t_final']),
+                                          int(params.get('n_points', 1000)))
+            t, y = ctl.step_response(tf, **kwargs)
+        return {'t': _finite(t), 'y': _finite(np.squeeze(y))}
+    raise RPCError(METHOD_NOT_FOUND, f"Método desconhecido: {method}")
+
+
+def _warm_up():
+    # Importa os módulos pesados uma vez por processo de trabalho
+    import diagram  # noqa: F401
+
+
+def _worker(method, params):
+    # Converte exceções em (código, mensagem): nem toda exceção é serializável
+    try:
+        return True, run_method(method, params)
+    except RPCError as e:
+        return False, (e.code, str(e))
+    except Exception as e:
+        return False, (SERVER_ERROR, f"{type(e).__name__}: {e}")
+
+
+class AnalysisServer:
+    """Despacha requisições JSON-RPC para um pool de processos, com cache de resultados."""
+    METHODS = ('reduce', 'matrix', 'bode', 'margins', 'step')
+
+    def __init__(self, workers=None, cache_size=512):
+        # 'fork' herdaria os sockets das conexões abertas; forkserver/spawn partem de um processo limpo
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                        mp_context=context, initializer=_warm_up)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # chave canônica -> resultado
+        self._inflight = {}          # chave canônica -> asyncio.Future
+
+    async def call(self, method, params):
+        if method not in self.METHODS:
+            raise RPCError(METHOD_NOT_FOUND, f"Método desconhecido: {method}")
+        if not isinstance(params, dict):
+            raise RPCError(INVALID_PARAMS, "params deve ser um objeto")
+
+        key = canonical_key(method, params)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            ok, result = await loop.run_in_executor(self.pool, _worker, method, params)
+            if not ok:
+                raise RPCError(*result)
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Evita aviso de exceção não consumida
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def handle_one(self, req):
+        """Processa um objeto JSON-RPC; retorna a resposta (None para notificações)."""
+        if not isinstance(req, dict) or req.get('jsonrpc') != '2.0' or 'method' not in req:
+            return _error(None, INVALID_REQUEST, "Requisição JSON-RPC inválida")
+        rid = req.get('id')
+        try:
+            result = await self.call(req['method'], req.get('params', {}))
+            response = {'jsonrpc': '2.0', 'id': rid, 'result': result}
+        except RPCError as e:
+            response = _error(rid, e.code, str(e))
+        except Exception as e:
+            response = _error(rid, SERVER_ERROR, f"{type(e).__name__}: {e}")
+        return response if 'id' in req else None
+
+    async def handle_payload(self, data):
+        """Processa o corpo de uma mensagem (objeto ou lote); retorna o texto da resposta."""
+        try:
+            msg = json.loads(data)
+        except (ValueError, UnicodeDecodeError):
+            return json.dumps(_error(None, PARSE_ERROR, "JSON inválido"))
+        if isinstance(msg, list):
+            if not msg:
+                return json.dumps(_error(None, INVALID_REQUEST, "Lote vazio"))
+            # As requisições do lote rodam em paralelo no pool
+            responses = await asyncio.gather(*(self.handle_one(r) for r in msg))
+            responses = [r for r in responses if r is not None]
+            return json.dumps(responses) if responses else None
+        response = await self.handle_one(msg)
+        return json.dumps(response) if response is not None else None
+
+    async def serve_http(self, reader, writer):
+        """Conexão HTTP/1.1 (POST com Content-Length), com keep-alive."""
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                lines = head.decode('latin-1').split('\r\n')
+                method = lines[0].split(' ')[0]
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                if method != 'POST':
+                    status, text = '405 Method Not Allowed', json.dumps(
+                        _error(None, INVALID_REQUEST, "Use POST"))
+                else:
+                    status, text = '200 OK', await self.handle_payload(body)
+                payload = (text or '').encode()
+                keep = headers.get('connection', '').lower() != 'close'
+                writer.write((f"HTTP/1.1 {status if payload else '204 No Content'}\r\n"
+                              "Content-Type: application/json\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n").encode()
+                             + payload)
+                await writer.drain()
+                if not keep:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_lines(self, reader, writer):
+        """Conexão por socket Unix: uma mensagem JSON-RPC por linha, respostas em ordem."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                text = await self.handle_payload(line)
+                if text is not None:
+                    writer.write(text.encode() + b'\n')
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def _error(rid, code, message):
+    return {'jsonrpc': '2.0', 'id': rid, 'error': {'code': code, 'message': message}}
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor JSON-RPC do Block Diagram Studio")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Caminho de socket Unix (no lugar de HTTP)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=512)
+    args = parser.parse_args(argv)
+
+    app = AnalysisServer(args.workers, args.cache_size)
+    if args.unix:
+        server = await asyncio.start_unix_server(app.serve_lines, path=args.unix, backlog=1024)
+        print(f"Servidor JSON-RPC em unix:{args.unix}")
+    else:
+        server = await asyncio.start_server(app.serve_http, args.host, args.port, backlog=1024)
+        print(f"Servidor JSON-RPC em http://{args.host}:{args.port}/")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
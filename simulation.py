@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Simulação no tempo do diagrama completo, incluindo blocos não lineares."""
+
+import numpy as np
+import control as ctl
+from scipy import linalg
+
+from delay import DelayLine
+from discrete import common_sample_time, is_discrete
+
+# Blocos não lineares sem memória de estado (exceto o limitador de taxa) e seus parâmetros
+NONLINEAR_BLOCKS = {
+    'saturation': ('lo', 'hi'),  # Saturação: limita a saída a [lo, hi]
+    'deadzone': ('lo', 'hi'),    # Zona morta: saída nula em [lo, hi]
+    'ratelimit': ('rate',),      # Limitador de taxa: |dy/dt| <= rate
+}
+
+
+def nonlinear_spec(kind, params):
+    """Valida um bloco não linear e retorna sua descrição canônica (kind, ((nome, valor), ...))."""
+    if kind not in NONLINEAR_BLOCKS:
+        raise ValueError(f"Bloco não linear desconhecido: {kind}")
+    names = NONLINEAR_BLOCKS[kind]
+    missing = [n for n in names if n not in params]
+    extra = [n for n in params if n not in names]
+    if missing or extra:
+        raise ValueError(f"Parâmetros de '{kind}': {', '.join(names)}")
+    values = tuple((n, float(params[n])) for n in names)
+    p = dict(values)
+    if 'lo' in p and p['lo'] > p['hi']:
+        raise ValueError(f"'{kind}': lo deve ser menor ou igual a hi.")
+    if 'rate' in p and p['rate'] <= 0:
+        raise ValueError("'ratelimit': a taxa deve ser positiva.")
+    return kind, values
+
+
+def default_timing(tfs, max_steps=200000):
+    """Passo e horizonte de simulação (dt, t_final) a partir dos polos dos blocos LTI."""
+    Ts = common_sample_time(tfs)
+    mags = np.concatenate([np.abs(np.roots(tf.den[0][0])) for tf in tfs if not is_discrete(tf)]
+                          + [np.zeros(0)])
+    mags = mags[mags > 1e-9]
+    fast, slow = (mags.max(), mags.min()) if len(mags) else (1.0, 1.0)
+    dt = Ts or 0.05 / fast
+    t_final = min(20.0 / slow, dt * max_steps)
+    return dt, max(t_final, 100 * dt)
+
+
+class DiagramSimulator:
+    """Compila o diagrama num escalonamento fixo e o integra com passo constante dt.
+
+    Cada nó é um somador dos blocos que chegam nele (mais a entrada externa,
+    se for um nó de entrada), cada um com o seu sinal cadastrado, como em
+    BlockDiagram.transfer_matrix. Blocos LTI mantêm o
+    próprio estado (discretizados por ZOH exato quando contínuos) e os
+    atrasos de transporte usam uma linha de atraso circular; blocos
+    com transmissão direta (D ≠ 0 ou não lineares) definem a ordem
+    topológica de avaliação dos nós, e um ciclo entre eles é um laço
+    algébrico. Os buffers são alocados na compilação: o laço de
+    integração não cria arrays por passo.
+    """
+    def __init__(self, bd, dt=None, record=None):
+        edges = bd.edges
+        if not edges:
+            raise ValueError("Diagrama vazio.")
+        self.nodes = list(dict.fromkeys(bd.inputs + bd.outputs
+                                        + [n for e in edges for n in (e['u'], e['v'])]))
+        idx = {n: i for i, n in enumerate(self.nodes)}
+        self.inputs = list(bd.inputs)
+        self.record = list(record) if record else list(bd.outputs)
+        unknown = [n for n in self.record if n not in idx]
+        if unknown:
+            raise ValueError(f"Nós inexistentes: {', '.join(unknown)}")
+        N, E = len(self.nodes), len(edges)
+
+        lti = [(k, bd._edge_tf(e)) for k, e in enumerate(edges)
+               if e.get('nl') is None and e.get('delay') is None]
+        delays = {k: e['delay'] for k, e in enumerate(edges) if e.get('delay') is not None}
+        Ts = common_sample_time([tf for _, tf in lti])
+        if dt is None:
+            dt = Ts or default_timing([tf for _, tf in lti])[0] if lti else 0.01
+            if delays and not Ts:
+                dt = min(dt, min(delays.values()))
+        if dt <= 0:
+            raise ValueError("O passo de simulação deve ser positivo.")
+        if Ts and not np.isclose(dt, Ts):
+            raise ValueError(f"Diagrama com blocos discretos: o passo deve ser Ts = {Ts}.")
+        self.dt = float(dt)
+
+        # Realizações de cada bloco LTI, preenchidas com zeros até a maior ordem
+        ss = [ctl.tf2ss(tf) for _, tf in lti]
+        order = max([np.asarray(s.A).shape[0] for s in ss] + [0])
+        L = len(lti)
+        self._Ad = np.zeros((L, order, order))
+        self._Bd = np.zeros((L, order))
+        self._C = np.zeros((L, order))
+        self._D = np.zeros(L)
+        for l, ((_, tf), s) in enumerate(zip(lti, ss)):
+            A, B = np.asarray(s.A, dtype=float), np.asarray(s.B, dtype=float).ravel()
+            n = A.shape[0]
+            if n and not is_discrete(tf):
+                aug = np.zeros((n + 1, n + 1))
+                aug[:n, :n], aug[:n, n] = A, B
+                Phi = linalg.expm(aug * self.dt)
+                A, B = Phi[:n, :n], Phi[:n, n]
+            self._Ad[l, :n, :n], self._Bd[l, :n] = A, B
+            self._C[l, :n] = np.asarray(s.C, dtype=float).ravel()
+            self._D[l] = float(np.asarray(s.D).squeeze())
+        self._lti_edge = np.array([k for k, _ in lti], dtype=int)
+        self._lti_src = np.array([idx[edges[k]['u']] for k, _ in lti], dtype=int)
+        self._nl = {k: e['nl'] for k, e in enumerate(edges) if e.get('nl') is not None}
+        self._delays = [(k, idx[edges[k]['u']], DelayLine(T, self.dt)) for k, T in delays.items()]
+
+        # Somadores: nó = S·[saídas dos blocos; entradas externas]
+        S = np.zeros((N, E + len(self.inputs)))
+        for k, e in enumerate(edges):
+            key = (e['u'], e['v'])
+            S[idx[e['v']], k] = float(bd._edge_sign(key))
+        for j, n in enumerate(self.inputs):
+            S[idx[n], E + j] = 1.0
+
+        feedthrough = {k for k in self._nl}
+        feedthrough |= {k for l, (k, _) in enumerate(lti) if self._D[l] != 0.0}
+        levels = self._schedule(edges, feedthrough, idx)
+
+        # Para cada nível: nós a avaliar e blocos com transmissão direta que partem deles
+        lti_pos = {k: l for l, k in enumerate(self._lti_edge)}
+        self._levels = []
+        for level in levels:
+            rows = np.array(level, dtype=int)
+            ft = [k for k in sorted(feedthrough) if idx[edges[k]['u']] in set(level)]
+            ft_lti = [k for k in ft if k in lti_pos]
+            self._levels.append((
+                rows, np.ascontiguousarray(S[rows]), np.empty(len(rows)),
+                np.array(ft_lti, dtype=int),
+                np.array([lti_pos[k] for k in ft_lti], dtype=int),
+                np.array([idx[edges[k]['u']] for k in ft_lti], dtype=int),
+                np.array([self._D[lti_pos[k]] for k in ft_lti]),
+                np.empty(len(ft_lti)), np.empty(len(ft_lti)),
+                [(k, idx[edges[k]['u']]) + self._nl[k] for k in ft if k in self._nl],
+            ))
+
+        self._rec = np.array([idx[n] for n in self.record], dtype=int)
+        self._E = E
+        self._x = np.zeros((L, order))
+        self._xn = np.zeros((L, order))
+        self._bu = np.zeros((L, order))
+        self._u = np.zeros(L)
+        self._cx = np.zeros(L)
+        self._y = np.zeros(E + len(self.inputs))
+        self._v = np.zeros(N)
+        self.reset()
+
+    @staticmethod
+    def _schedule(edges, feedthrough, idx):
+        """Ordena os nós em níveis topológicos pelas arestas com transmissão direta."""
+        deps = {i: set() for i in idx.values()}
+        for k in feedthrough:
+            deps[idx[edges[k]['v']]].add(idx[edges[k]['u']])
+        levels, done = [], set()
+        while len(done) < len(deps):
+            ready = sorted(i for i, d in deps.items() if i not in done and d <= done)
+            if not ready:
+                # Percorre as dependências pendentes até repetir um nó: é o ciclo
+                names = {i: n for n, i in idx.items()}
+                node, path = next(i for i in deps if i not in done), []
+                while node not in path:
+                    path.append(node)
+                    node = next(d for d in deps[node] if d not in done)
+                cycle = path[path.index(node):] + [node]
+                raise ValueError("Laço algébrico (blocos com transmissão direta): "
+                                 + " → ".join(names[i] for i in reversed(cycle)))
+            levels.append(ready)
+            done.update(ready)
+        return levels
+
+    def reset(self):
+        """Zera os estados dos blocos e a memória dos limitadores de taxa."""
+        self._x[:] = 0.0
+        for _, _, line in self._delays:
+            line.reset()
+        self._last = {k: 0.0 for k, (kind, _) in self._nl.items() if kind == 'ratelimit'}
+        self.k = 0
+
+    def _inputs(self, inputs, t):
+        """Matriz (len(t), entradas) com os sinais externos (escalar, array ou função de t)."""
+        W = np.zeros((len(t), len(self.inputs)))
+        for name, value in (inputs or {}).items():
+            if name not in self.inputs:
+                raise ValueError(f"'{name}' não é um nó de entrada.")
+            j = self.inputs.index(name)
+            W[:, j] = value(t) if callable(value) else value
+        return W
+
+    def run(self, t_final, inputs=None, progress=None):
+        """Integra até t_final a partir do estado atual; retorna (t, {nó registrado: sinal}).
+
+        inputs: {nó de entrada: escalar (degrau), array ou função vetorizada de t}.
+        progress(fração), se dado, é chamado a cada ~1 % dos passos.
+        """
+        n = int(round(t_final / self.dt)) + 1
+        t = (self.k + np.arange(n)) * self.dt
+        W = self._inputs(inputs, t)
+        out = np.empty((n, len(self._rec)))
+        E, dt = self._E, self.dt
+        x, xn, bu, u, cx, y, v = self._x, self._xn, self._bu, self._u, self._cx, self._y, self._v
+        Ad, Bd, C = self._Ad, self._Bd, self._C
+        every = max(n // 100, 1)
+
+        for i in range(n):
+            if progress is not None and i % every == 0:
+                progress(i / n)
+            # Saídas que dependem só do estado; as de transmissão direta são completadas abaixo
+            np.einsum('li,li->l', C, x, out=cx)
+            np.put(y, self._lti_edge, cx)
+            for k, _, line in self._delays:
+                y[k] = line.read()
+            y[E:] = W[i]
+            for rows, S_l, buf, ft, pos, src, D, tmp, tmp2, nl in self._levels:
+                np.dot(S_l, y, out=buf)
+                np.put(v, rows, buf)
+                if len(ft):
+                    np.take(v, src, out=tmp)
+                    tmp *= D
+                    np.take(cx, pos, out=tmp2)
+                    tmp += tmp2
+                    np.put(y, ft, tmp)
+                for k, s, kind, p in nl:
+                    y[k] = self._nonlinear(k, kind, p, v[s], dt)
+            np.take(v, self._rec, out=out[i])
+            for _, s, line in self._delays:
+                line.write(v[s])
+
+            # Atualização dos estados: x ← Ad·x + Bd·u
+            np.take(v, self._lti_src, out=u)
+            np.einsum('lij,lj->li', Ad, x, out=xn)
+            np.multiply(Bd, u[:, None], out=bu)
+            xn += bu
+            x, xn = xn, x
+        # Mantém em self._x o estado mais recente (os buffers trocam de papel a cada passo)
+        self._x, self._xn = x, xn
+        self.k += n
+        return t, {name: out[:, j] for j, name in enumerate(self.record)}
+
+    def _nonlinear(self, k, kind, p, x, dt):
+        if kind == 'saturation':
+            return min(max(x, p[0][1]), p[1][1])
+        if kind == 'deadzone':
+            lo, hi = p[0][1], p[1][1]
+            return x - hi if x > hi else (x - lo if x < lo else 0.0)
+        # ratelimit: a saída anda no máximo rate·dt por passo
+        step = p[0][1] * dt
+        last = self._last[k]
+        y = last + min(max(x - last, -step), step)
+        self._last[k] = y
+        return y
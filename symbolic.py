@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Blocos com parâmetros simbólicos: redução simbólica única e avaliação vetorizada em NumPy."""
+
+import numpy as np
+import sympy as sp
+from scipy import linalg
+
+s_sym = sp.symbols('s')
+
+
+def parse_coefficient(text):
+    """Converte um coeficiente digitado em número (float) ou expressão simbólica."""
+    expr = sp.sympify(text.replace('^', '**'), locals={'s': s_sym})
+    if expr.has(s_sym):
+        raise ValueError(f"Coeficiente não pode depender de s: {text}")
+    return float(expr) if expr.is_number else expr
+
+
+def to_exact(c):
+    """Coeficiente numérico como racional (cancelamentos exatos na redução simbólica)."""
+    if isinstance(c, sp.Basic) and not c.is_number:
+        return c
+    return sp.nsimplify(float(c), rational=True)
+
+
+def poly_expr(num, den, var=s_sym):
+    """Expressão racional num(var)/den(var) a partir de coeficientes decrescentes."""
+    ne = sum(to_exact(c)*var**i for i, c in enumerate(reversed(list(num))))
+    de = sum(to_exact(c)*var**i for i, c in enumerate(reversed(list(den))))
+    return ne / de
+
+
+def free_parameters(exprs):
+    """Parâmetros (símbolos exceto s) presentes nas expressões, em ordem alfabética."""
+    found = set()
+    for e in exprs:
+        if isinstance(e, sp.Basic):
+            found |= e.free_symbols
+    found.discard(s_sym)
+    return sorted(found, key=lambda p: p.name)
+
+
+class CompiledTransfer:
+    """TF reduzida simbolicamente e compilada (lambdify + CSE) para arrays de parâmetros.
+
+    Todos os métodos recebem os parâmetros como palavras-chave (escalares ou
+    arrays que se combinam por broadcasting) e retornam resultados com uma
+    linha por combinação de parâmetros.
+    """
+    def __init__(self, expr, params=None):
+        num, den = sp.fraction(sp.cancel(sp.together(expr)))
+        pn, pd = sp.Poly(num, s_sym), sp.Poly(den, s_sym)
+        self.expr = num / den
+        self.params = list(params) if params is not None else free_parameters([self.expr])
+        self.n_num = len(pn.all_coeffs())
+        coeffs = pn.all_coeffs() + pd.all_coeffs()
+        self._f = sp.lambdify(self.params, coeffs, modules='numpy', cse=True)
+
+    @property
+    def names(self):
+        return [p.name for p in self.params]
+
+    def _arrays(self, values):
+        missing = [n for n in self.names if n not in values]
+        if missing:
+            raise ValueError(f"Valores ausentes para os parâmetros: {', '.join(missing)}")
+        arrays = np.broadcast_arrays(*[np.asarray(values[n], dtype=float).ravel()
+                                       for n in self.names]) if self.names else []
+        return arrays, (arrays[0].shape[0] if arrays else 1)
+
+    def coefficients(self, **values):
+        """Coeficientes (num, den) com formato (N, grau+1), den normalizado (mônico)."""
+        arrays, n = self._arrays(values)
+        out = self._f(*arrays)
+        coeffs = np.stack([np.broadcast_to(np.asarray(c, dtype=float), (n,)) for c in out], axis=1)
+        num, den = coeffs[:, :self.n_num], coeffs[:, self.n_num:]
+        lead = den[:, :1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return num / lead, den / lead
+
+    def poles(self, **values):
+        """Polos de cada combinação (N, ordem), via autovalores de matrizes companheiras."""
+        _, den = self.coefficients(**values)
+        order = den.shape[1] - 1
+        if order == 0:
+            return np.zeros((den.shape[0], 0), dtype=complex)
+        comp = np.zeros((den.shape[0], order, order))
+        comp[:, 0, :] = -den[:, 1:]
+        comp[:, np.arange(1, order), np.arange(order - 1)] = 1.0
+        bad = ~np.all(np.isfinite(comp), axis=(1, 2))
+        comp[bad] = 0.0
+        p = np.linalg.eigvals(comp)
+        p[bad] = np.nan
+        return p
+
+    def freqresp(self, omega, **values):
+        """Resposta em frequência G(jω) com formato (N, len(omega))."""
+        num, den = self.coefficients(**values)
+        x = 1j * np.asarray(omega, dtype=float)[None, :]
+        def horner(c):
+            acc = np.zeros((c.shape[0], x.shape[1]), dtype=complex)
+            for k in range(c.shape[1]):
+                acc = acc * x + c[:, k:k+1]
+            return acc
+        return horner(num) / horner(den)
+
+    def _step_samples(self, t, values):
+        """Gera y(t_k) de todas as combinações, amostra a amostra (ZOH exato em t uniforme)."""
+        num, den = self.coefficients(**values)
+        N, order = den.shape[0], den.shape[1] - 1
+        if num.shape[1] > den.shape[1]:
+            raise ValueError("TF imprópria: grau do numerador maior que o do denominador.")
+        b = np.zeros_like(den)
+        b[:, den.shape[1] - num.shape[1]:] = num
+        D = b[:, 0]
+        if order == 0:
+            for _ in t:
+                yield D
+            return
+
+        # Forma canônica controlável em lote, discretizada com uma única expm aumentada
+        C = b[:, 1:] - D[:, None] * den[:, 1:]
+        aug = np.zeros((N, order + 1, order + 1))
+        aug[:, 0, :order] = -den[:, 1:]
+        aug[:, np.arange(1, order), np.arange(order - 1)] = 1.0
+        aug[:, 0, order] = 1.0
+        E = linalg.expm(np.nan_to_num(aug) * (t[1] - t[0]))
+        Ad, Bd = E[:, :order, :order], E[:, :order, order]
+
+        x = np.zeros((N, order))
+        y = np.empty(N)
+        for _ in t:
+            np.einsum('ij,ij->i', C, x, out=y)
+            y += D
+            yield y
+            x = np.einsum('nij,nj->ni', Ad, x)
+            x += Bd
+
+    def step(self, t, **values):
+        """Resposta ao degrau (N, len(t)) por simulação em lote."""
+        t = np.asarray(t, dtype=float)
+        return np.stack([y.copy() for y in self._step_samples(t, values)], axis=1)
+
+    def step_info(self, t, **values):
+        """Métricas do degrau por combinação: valor final, sobressinal (%), subida e acomodação (2 %).
+
+        As métricas são acumuladas amostra a amostra, sem guardar a matriz (N, len(t));
+        combinações instáveis recebem NaN.
+        """
+        t = np.asarray(t, dtype=float)
+        num, den = self.coefficients(**values)
+        stable = np.all(self.poles(**values).real < 0, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            final = np.where(stable, num[:, -1] / den[:, -1], np.nan)
+        scale = np.where(np.abs(final) > 1e-12, final, 1.0)
+
+        n = len(final)
+        peak = np.full(n, -np.inf)
+        t10 = np.full(n, np.nan)
+        t90 = np.full(n, np.nan)
+        settling = np.full(n, t[0])
+        for tk, y in zip(t, self._step_samples(t, values)):
+            yn = y / scale
+            np.maximum(peak, yn, out=peak)
+            t10[np.isnan(t10) & (yn >= 0.1)] = tk
+            t90[np.isnan(t90) & (yn >= 0.9)] = tk
+            settling[np.abs(yn - 1.0) > 0.02] = tk
+        # Acomodação: primeiro instante após a última saída da faixa de ±2 %
+        dt = t[1] - t[0]
+        settling = np.where(settling > t[0], np.minimum(settling + dt, t[-1]), settling)
+
+        nan = np.where(stable, 0.0, np.nan)
+        return {
+            'final': final,
+            'overshoot': np.maximum(peak - 1.0, 0.0) * 100.0 + nan,
+            'rise_time': t90 - t10 + nan,
+            'settling_time': settling + nan,
+        }
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""TaskExecutor sem Tk: um root falso executa os callbacks agendados com after()."""
+
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+from executor import TaskExecutor
+
+
+class FakeRoot:
+    def __init__(self):
+        self.calls = []
+
+    def after(self, ms, fn):
+        self.calls.append(fn)
+
+    def pump(self, timeout=5.0):
+        end = time.time() + timeout
+        while self.calls and time.time() < end:
+            self.calls.pop(0)()
+            time.sleep(0.005)
+
+
+def test_results_are_delivered_on_the_root():
+    root = FakeRoot()
+    ex = TaskExecutor(root)
+    done = []
+    ex.submit('a', lambda token, x: x * 2, 21, on_done=done.append)
+    ex.submit('b', lambda token: 'b', on_done=done.append)
+    root.pump()
+    assert sorted(done, key=str) == [42, 'b']
+    ex.shutdown()
+
+
+def test_newer_request_replaces_running_task():
+    root = FakeRoot()
+    ex = TaskExecutor(root)
+    done = []
+
+    def slow(token, value):
+        for _ in range(200):
+            token.progress(0.5)
+            time.sleep(0.005)
+        return value
+
+    ex.submit('plot', slow, 1, on_done=done.append, signature=1)
+    ex.submit('plot', slow, 2, on_done=done.append, signature=2)
+    root.pump()
+    assert done == [2]
+    ex.shutdown()
+
+
+def test_process_exits_without_waiting_for_uninterruptible_task():
+    # Um cálculo sem pontos de cancelamento não pode segurar o fechamento
+    code = textwrap.dedent("""
+        import time
+        from executor import TaskExecutor
+
+        class Root:
+            def after(self, ms, fn):
+                pass
+
+        ex = TaskExecutor(Root())
+        ex.submit('calc', lambda token: time.sleep(60))
+        time.sleep(0.1)
+        ex.shutdown()
+    """)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.time()
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True, timeout=30)
+    assert time.time() - start < 10
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Margens de malha: calculadas no laço aberto, não no canal em malha fechada."""
+
+import control as ctl
+import numpy as np
+import pytest
+
+from diagram import BlockDiagram
+
+OMEGA = np.logspace(-2, 3, 4000)
+
+
+def _loop(delay=None):
+    bd = BlockDiagram()
+    bd.add_block('input', 'e', ctl.tf([1], [1]))
+    bd.add_block('e', 'x', ctl.tf([2], [1, 3, 2, 0]))
+    if delay:
+        bd.add_delay_block('x', 'output', delay)
+    else:
+        bd.add_block('x', 'output', ctl.tf([1], [1]))
+    bd.add_block('output', 'e', ctl.tf([1], [1]), '-')
+    return bd
+
+
+def test_loop_margins_match_open_loop():
+    gm, pm, _, _ = ctl.margin(ctl.tf([2], [1, 3, 2, 0]))
+    m = _loop().loop_margins(OMEGA)
+    assert m['gm_db'] == pytest.approx(20 * np.log10(gm), abs=1e-3)
+    assert m['pm_deg'] == pytest.approx(pm, abs=1e-3)
+
+
+def test_loop_margins_use_exact_delay():
+    plain = _loop().loop_margins(OMEGA)
+    delayed = _loop(0.1).loop_margins(OMEGA)
+    lag = np.degrees(plain['w_gc'] * 0.1)
+    assert delayed['pm_deg'] == pytest.approx(plain['pm_deg'] - lag, abs=1e-2)
+
+
+def test_loop_response_matches_loop_transfer():
+    bd = _loop()
+    L = bd.loop_transfer('output', 'e')
+    w = np.logspace(-1, 1, 20)
+    expected = np.array([complex(L.subs('s', 1j * x)) for x in w])
+    assert np.allclose(bd.loop_response('output', 'e', w), expected)
+
+
+def test_diagram_without_loops_has_no_margins():
+    bd = BlockDiagram()
+    bd.add_block('input', 'output', ctl.tf([1], [1, 1]))
+    assert bd.loop_margins(OMEGA) == {'gm_db': None, 'w_pc': None, 'pm_deg': None, 'w_gc': None}
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""ReductionPlan.update: reduções incrementais iguais a uma redução do zero."""
+
+import control as ctl
+import numpy as np
+
+from diagram import BlockDiagram
+
+
+def _same(a, b):
+    w = np.logspace(-2, 2, 50)
+    ga = np.polyval(a.num[0][0], 1j * w) / np.polyval(a.den[0][0], 1j * w)
+    gb = np.polyval(b.num[0][0], 1j * w) / np.polyval(b.den[0][0], 1j * w)
+    return np.allclose(ga, gb, rtol=1e-8, atol=1e-12)
+
+
+def _fresh(bd):
+    bd = bd.copy()
+    bd.plan = None
+    return bd.reduce()
+
+
+def _loop():
+    bd = BlockDiagram()
+    bd.add_block('input', 'e', ctl.tf([1], [1]))
+    bd.add_block('e', 'x', ctl.tf([2], [1, 1]))
+    bd.add_block('x', 'output', ctl.tf([1], [1, 3]))
+    bd.add_block('input', 'p', ctl.tf([1], [1, 5]))
+    bd.add_block('p', 'e', ctl.tf([0.5], [1]))
+    bd.add_block('output', 'e', ctl.tf([1], [1]), '-')
+    return bd
+
+
+def test_update_after_set_coefficients_matches_fresh_reduce():
+    bd = _loop()
+    bd.reduce()
+    first = bd.plan
+    bd.set_coefficients('e', 'x', [4, 1], [1, 2, 1])
+    G = bd.reduce()
+    assert first.result is not None
+    assert bd.plan is not first and bd.plan.structure == first.structure
+    assert bd.plan.recomputed < len(bd.plan.values)
+    assert _same(G, _fresh(bd))
+
+
+def test_update_with_parametric_block_matches_fresh_reduce():
+    bd = _loop()
+    bd.set_coefficients('p', 'e', ['K'], [1])
+    bd.params['K'] = 0.5
+    bd.reduce()
+    for K in (2.0, -1.0):
+        bd.params['K'] = K
+        assert _same(bd.reduce(), _fresh(bd))
+
+
+def test_unchanged_diagram_recomputes_nothing():
+    bd = _loop()
+    G = bd.reduce()
+    assert _same(bd.reduce(), G)
+    assert bd.plan.recomputed == 0
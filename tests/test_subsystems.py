@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Biblioteca de subsistemas: definições recursivas são rejeitadas sem efeito colateral."""
+
+import control as ctl
+import pytest
+
+from diagram import BlockDiagram, SubsystemLibrary
+
+
+def test_recursive_redefinition_keeps_previous_definition():
+    lib = SubsystemLibrary()
+    inner = BlockDiagram()
+    inner.add_block('input', 'output', ctl.tf([1], [1, 1]))
+    lib.define('X', inner)
+
+    main = BlockDiagram()
+    main.library = lib
+    main.add_subsystem('input', 'output', 'X')
+    with pytest.raises(ValueError):
+        lib.define('X', main.copy())
+
+    assert lib.definitions['X'] is inner
+    main.canonical_hash()
+    assert ctl.dcgain(main.reduce()) == pytest.approx(1.0)
+
+
+def test_rejected_definition_keeps_the_diagram_library():
+    lib = SubsystemLibrary()
+    inner = BlockDiagram()
+    inner.add_block('input', 'output', ctl.tf([1], [1, 1]))
+    lib.define('X', inner)
+
+    own = SubsystemLibrary()
+    own.define('X', inner.copy())
+    candidate = BlockDiagram()
+    candidate.library = own
+    candidate.add_subsystem('input', 'output', 'X')
+    with pytest.raises(ValueError):
+        lib.define('X', candidate)
+    assert candidate.library is own
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Sintonia automática de controladores (PID, PI, avanço-atraso) por evolução diferencial em lote."""
+
+import re
+
+import numpy as np
+import sympy as sp
+from scipy import integrate
+
+from montecarlo import compiled_transfer, loop_margins, process_pool
+
+# Formas de controlador e seus parâmetros de projeto
+CONTROLLERS = {
+    'pid': ('Kp', 'Ki', 'Kd'),   # Kp + Ki/s + Kd·s/(Tf·s + 1)
+    'pi': ('Kp', 'Ki'),          # Kp + Ki/s
+    'leadlag': ('K', 'z', 'p'),  # K·(s + z)/(s + p)
+}
+
+# Critérios (e rótulos): integral do erro ao degrau ou metas de sobressinal e acomodação
+OBJECTIVES = {
+    'itae': 'ITAE',
+    'ise': 'ISE',
+    'step': 'Sobressinal / acomodação',
+}
+
+_PENALTY = 1e9  # Custo base das soluções que violam as margens mínimas
+
+_CONTROLLER = re.compile(r'^\s*(.+?)\s*(?:→|->)\s*(.+?)\s*:\s*(\w+)\s*$')
+
+
+def parse_controllers(text):
+    """Lê 'e→u:pid; a→b:leadlag' como {(origem, destino): forma}."""
+    controllers = {}
+    for item in text.split(';'):
+        if not item.strip():
+            continue
+        m = _CONTROLLER.match(item)
+        if not m:
+            raise ValueError(f"Controlador inválido: {item.strip()} (use origem→destino:forma)")
+        kind = m.group(3).lower()
+        if kind not in CONTROLLERS:
+            raise ValueError(f"Forma de controlador desconhecida: {kind} ({', '.join(CONTROLLERS)})")
+        controllers[(m.group(1), m.group(2))] = kind
+    if not controllers:
+        raise ValueError("Informe ao menos um bloco controlador.")
+    return controllers
+
+
+def parse_bounds(text):
+    """Lê 'Kp=0:10; Ki=0:5' como {nome: (mín, máx)}."""
+    bounds = {}
+    for item in text.split(';'):
+        if not item.strip():
+            continue
+        name, sep, rng = item.partition('=')
+        lo, colon, hi = rng.partition(':')
+        try:
+            lo, hi = float(lo), float(hi)
+        except ValueError:
+            raise ValueError(f"Limite inválido: {item.strip()} (use nome=mín:máx)")
+        if not sep or not colon or not name.strip() or lo > hi:
+            raise ValueError(f"Limite inválido: {item.strip()} (use nome=mín:máx)")
+        bounds[name.strip()] = (lo, hi)
+    return bounds
+
+
+def controller_coefficients(kind, values, filter_tc=0.01):
+    """Coeficientes (num, den) da forma 'kind' com os parâmetros dados (símbolos ou números)."""
+    if kind == 'pid':
+        Kp, Ki, Kd = values
+        return [Kd + Kp * filter_tc, Kp + Ki * filter_tc, Ki], [filter_tc, 1.0, 0.0]
+    if kind == 'pi':
+        Kp, Ki = values
+        return [Kp, Ki], [1.0, 0.0]
+    K, z, p = values
+    return [K, K * z], [1.0, p]
+
+
+def variable_names(controllers):
+    """Nomes das variáveis de projeto de cada bloco (sufixados pelo bloco se houver mais de um)."""
+    names = {}
+    for (u, v), kind in controllers.items():
+        if len(controllers) == 1:
+            names[(u, v)] = list(CONTROLLERS[kind])
+        else:
+            names[(u, v)] = [re.sub(r'\W', '_', f"{p}_{u}_{v}") for p in CONTROLLERS[kind]]
+    return names
+
+
+def parametrize(bd, controllers, filter_tc=0.01):
+    """Cópia do diagrama com os blocos controladores na forma simbólica; retorna (diagrama, nomes)."""
+    bd = bd.copy()
+    names = variable_names(controllers)
+    clash = set(bd.parameters()) & {n for ns in names.values() for n in ns}
+    if clash:
+        raise ValueError(f"Parâmetros já usados no diagrama: {', '.join(sorted(clash))}")
+    for (u, v), kind in controllers.items():
+        edge = next((e for e in bd.edges if e['u'] == u and e['v'] == v), None)
+        if edge is None:
+            raise ValueError(f"Bloco {u}→{v} não existe!")
+        if edge.get('tf') is not None and getattr(edge['tf'], 'dt', 0):
+            raise ValueError(f"Sintonia disponível apenas para blocos contínuos: {u}→{v}")
+        num, den = controller_coefficients(kind, [sp.Symbol(n) for n in names[(u, v)]], filter_tc)
+        edge.clear()
+        edge.update({'u': u, 'v': v, 'tf': None, 'expr': (tuple(num), tuple(den))})
+    return bd, names
+
+
+def _evaluate_chunk(closed, loops, values, t, omega, objective, targets, constraints):
+    """Custo e métricas de um lote de candidatos (roda também nos processos de trabalho)."""
+    T = compiled_transfer(*closed)
+    stable = np.all(T.poles(**values).real < 0, axis=1)
+    metrics = {}
+    if objective == 'step':
+        with np.errstate(over='ignore', invalid='ignore'):
+            info = T.step_info(t, **values)
+        os_max, ts_max = targets
+        metrics['overshoot'], metrics['settling_time'] = info['overshoot'], info['settling_time']
+        J = (info['settling_time'] / ts_max
+             + 10.0 * np.maximum(info['overshoot'] - os_max, 0.0) / max(os_max, 1.0))
+    else:
+        with np.errstate(over='ignore', invalid='ignore'):
+            e = 1.0 - T.step(t, **values)
+            J = integrate.trapezoid(e ** 2 if objective == 'ise' else t * np.abs(e), t, axis=1)
+    metrics[objective] = J
+
+    # Margens no pior dos laços abertos nos blocos controladores
+    n = len(stable)
+    margins = loop_margins(loops, omega, values, n)
+    gm, pm = margins['gm_db'], margins['pm_deg']
+    metrics['gm_db'], metrics['pm_deg'] = gm, pm
+    gm_min, pm_min = constraints
+    violation = np.zeros(n)
+    if gm_min is not None:
+        violation += np.maximum(gm_min - gm, 0.0) / max(abs(gm_min), 1.0)
+    if pm_min is not None:
+        violation += np.maximum(pm_min - pm, 0.0) / max(abs(pm_min), 1.0)
+
+    cost = np.where(violation > 0, _PENALTY * (1.0 + violation), J)
+    cost = np.where(stable & np.isfinite(cost), cost, np.inf)
+    return cost, metrics
+
+
+class TuningResult:
+    """Melhor projeto encontrado: valores, custo, métricas, histórico e resposta ao degrau."""
+    def __init__(self, controllers, names, values, cost, metrics, history, t, y, filter_tc):
+        self.controllers = controllers
+        self.names = names
+        self.values = values  # {variável: valor}
+        self.cost = cost
+        self.metrics = metrics  # {métrica: valor} do melhor candidato
+        self.history = history  # Melhor custo a cada geração
+        self.t, self.y = t, y
+        self.filter_tc = filter_tc
+
+    @property
+    def feasible(self):
+        return np.isfinite(self.cost) and self.cost < _PENALTY
+
+    def coefficients(self):
+        """{(origem, destino): (num, den)} numéricos dos controladores sintonizados."""
+        return {key: controller_coefficients(kind, [self.values[n] for n in self.names[key]],
+                                             self.filter_tc)
+                for key, kind in self.controllers.items()}
+
+    def apply(self, bd):
+        """Grava os controladores sintonizados nos blocos do diagrama."""
+        for (u, v), (num, den) in self.coefficients().items():
+            bd.set_coefficients(u, v, [float(c) for c in num], [float(c) for c in den])
+
+
+def tune(bd, output, input, controllers, bounds, objective='itae', targets=(10.0, None),
+         gm_min=None, pm_min=None, t=None, omega=None, population=None, generations=40,
+         seed=None, workers=None, chunk=50, filter_tc=0.01, progress=None):
+    """Sintoniza os blocos 'controllers' ({(u, v): forma}) do canal input→output.
+
+    Evolução diferencial (rand/1/bin) sobre as variáveis limitadas por
+    'bounds'; cada geração é avaliada em lote (polos, degrau e margens
+    vetorizados), em processos separados se workers > 1. Candidatos
+    instáveis têm custo infinito e os que violam gm_min (dB) ou pm_min
+    (graus) ficam atrás de qualquer candidato viável. targets = (sobressinal
+    máx. %, acomodação máx. s) para objective='step'. progress(fração,
+    melhor TuningResult até agora) é chamado a cada geração.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objetivo desconhecido: {objective} ({', '.join(OBJECTIVES)})")
+    sym_bd, names = parametrize(bd, controllers, filter_tc)
+    variables = [n for ns in names.values() for n in ns]
+    missing = [n for n in variables if n not in bounds]
+    if missing:
+        raise ValueError(f"Defina limites (nome=mín:máx) para: {', '.join(missing)}")
+    lo = np.array([bounds[n][0] for n in variables])
+    hi = np.array([bounds[n][1] for n in variables])
+
+    T = compiled_transfer(sym_bd.symbolic_transfer(output, input), None)
+    loops = []
+    for (u, v) in controllers:
+        L = sym_bd.loop_transfer(u, v)
+        if L != 0:
+            compiled = compiled_transfer(L, None)
+            loops.append((compiled.expr, compiled.params))
+    fixed = {}
+    for name in set(T.names).union(*[[p.name for p in params] for _, params in loops]):
+        if name not in variables:
+            if name not in bd.params:
+                raise ValueError(f"Defina valores para os parâmetros: {name}")
+            fixed[name] = bd.params[name]
+
+    def values_of(X):
+        values = {n: X[:, j] for j, n in enumerate(variables)}
+        values.update({k: np.full(len(X), v) for k, v in fixed.items()})
+        return values
+
+    if t is None:
+        p = T.poles(**values_of(((lo + hi) / 2)[None, :]))[0]
+        slow = -p.real[p.real < 0]
+        t_final = 8.0 / slow.min() if len(slow) and np.all(p.real < 0) else 10.0
+        t = np.linspace(0, t_final, 400)
+    if omega is None:
+        omega = np.logspace(-2, 3, 600)
+    ts_max = targets[1] if targets[1] is not None else t[-1] / 2
+    args = ((T.expr, T.params), loops)
+    extra = (t, omega, objective, (targets[0], ts_max), (gm_min, pm_min))
+
+    d = len(variables)
+    P = population or max(15, 10 * d)
+    rng = np.random.default_rng(seed)
+    pool = process_pool(workers)
+
+    def evaluate(X):
+        values = values_of(X)
+        chunks = [{k: v[a:a + chunk] for k, v in values.items()} for a in range(0, len(X), chunk)]
+        if pool is not None:
+            futures = [pool.submit(_evaluate_chunk, *args, c, *extra) for c in chunks]
+            results = [f.result() for f in futures]
+        else:
+            results = [_evaluate_chunk(*args, c, *extra) for c in chunks]
+        cost = np.concatenate([r[0] for r in results])
+        metrics = {k: np.concatenate([r[1][k] for r in results]) for k in results[0][1]}
+        return cost, metrics
+
+    def snapshot(X, cost, metrics, history):
+        i = int(np.argmin(cost))
+        best = X[i:i + 1]
+        y = T.step(t, **values_of(best))[0]
+        return TuningResult(controllers, names, {n: float(x) for n, x in zip(variables, best[0])}, float(cost[i]),
+                            {k: float(m[i]) for k, m in metrics.items()}, list(history),
+                            t, y, filter_tc)
+
+    try:
+        X = lo + (hi - lo) * rng.random((P, d))
+        cost, metrics = evaluate(X)
+        history = [cost.min()]
+        F, CR = 0.7, 0.9
+        for g in range(generations):
+            # Três candidatos distintos (e diferentes de i) para cada mutante
+            R = rng.random((P, P))
+            R[np.arange(P), np.arange(P)] = np.inf
+            r = np.argsort(R, axis=1)[:, :3]
+            V = X[r[:, 0]] + F * (X[r[:, 1]] - X[r[:, 2]])
+            cross = rng.random((P, d)) < CR
+            cross[np.arange(P), rng.integers(d, size=P)] = True
+            U = np.clip(np.where(cross, V, X), lo, hi)
+
+            cu, mu = evaluate(U)
+            better = cu <= cost
+            X[better], cost[better] = U[better], cu[better]
+            for k in metrics:
+                metrics[k][better] = mu[k][better]
+            history.append(cost.min())
+            if progress:
+                progress((g + 1) / generations, snapshot(X, cost, metrics, history))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return snapshot(X, cost, metrics, history)